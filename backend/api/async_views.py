@@ -0,0 +1,53 @@
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from api.replicas import SAFE_METHODS, reset_health_checks
+
+ASYNC_VIEW_NAMES = ('recipe-list', 'recipe-detail', 'tag-list', 'tag-detail',
+                    'ingredient-list', 'ingredient-detail',
+                    'user-subscriptions')
+
+
+def prepare_connections():
+    close_old_connections()
+    if settings.DATABASE_HEALTH_CHECKS:
+        reset_health_checks()
+
+
+def render(request, response):
+    if not hasattr(response, 'render') or response.is_rendered:
+        return response
+    start = time.perf_counter()
+    response.render()
+    if hasattr(request, 'metrics_render_time'):
+        request.metrics_render_time = time.perf_counter() - start
+    return response
+
+
+def run_view(view, request, *args, **kwargs):
+    prepare_connections()
+    try:
+        return render(request, view(request, *args, **kwargs))
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await sync_to_async(
+            run_view, thread_sensitive=request.method not in SAFE_METHODS)(
+            view, request, *args, **kwargs)
+    return wrapper
+
+
+def use_async_views(patterns):
+    return [URLPattern(pattern.pattern, async_view(pattern.callback),
+                       pattern.default_args, pattern.name)
+            if pattern.name in ASYNC_VIEW_NAMES else pattern
+            for pattern in patterns]
@@ -0,0 +1,265 @@
+import json
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.settings import api_settings
+
+from recipes.models import IngredientsInRecipe, Recipe, Tag
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+SERVER_START_TIMEOUT = 30
+DEEP_PAGE = 10
+ASGI_WORKER = 'uvicorn.workers.UvicornWorker'
+REPLICA_ENV = ('DB_REPLICA_HOST', 'DB_REPLICA_PORT', 'DB_REPLICA_NAME')
+
+
+def get_commit():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def get_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS
+             if host and '*' not in host and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def get_scenarios():
+    recipe_ids = list(Recipe.objects.order_by('id').values_list(
+        'id', flat=True))
+    slugs = list(Tag.objects.order_by('id').values_list('slug', flat=True))
+    recipe = recipe_ids[len(recipe_ids) // 2]
+    deep_page = min(DEEP_PAGE,
+                    math.ceil(len(recipe_ids) / api_settings.PAGE_SIZE))
+    ingredients = list(IngredientsInRecipe.objects.filter(
+        recipe_id=recipe).values_list('ingredients_id', 'ingredients__name'))
+    prefix = ingredients[0][1][:3] if ingredients else 'а'
+    word = Recipe.objects.filter(id=recipe).values_list(
+        'name', flat=True).first().split()[0]
+
+    def tag_query(count, match='any'):
+        return ('&'.join(f'tags={slug}' for slug in slugs[:count])
+                + f'&tags_match={match}')
+
+    return {
+        'recipes_list': lambda rng: '/api/recipes/',
+        'recipes_page_deep':
+            lambda rng: f'/api/recipes/?page={deep_page}',
+        'recipes_cursor': lambda rng: '/api/recipes/?pagination=cursor',
+        'recipe_detail':
+            lambda rng: f'/api/recipes/{rng.choice(recipe_ids)}/',
+        'tags_filter_1': lambda rng: f'/api/recipes/?{tag_query(1)}',
+        'tags_filter_3': lambda rng: f'/api/recipes/?{tag_query(3)}',
+        'tags_filter_all_2':
+            lambda rng: f'/api/recipes/?{tag_query(2, "all")}',
+        'tags': lambda rng: '/api/tags/',
+        'ingredients_prefix': lambda rng: f'/api/ingredients/?name={prefix}',
+        'recipe_search': lambda rng: f'/api/recipes/search/?q={word}',
+        'what_to_cook': lambda rng: '/api/recipes/cook/?' + '&'.join(
+            f'ingredients={item}' for item, _ in ingredients),
+        'subscriptions':
+            lambda rng: '/api/users/subscriptions/?recipes_limit=3',
+        'users_list': lambda rng: '/api/users/',
+        'shopping_cart_txt':
+            lambda rng: '/api/recipes/download_shopping_cart/?type=txt',
+    }
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def summarize(durations, queries, statuses, elapsed):
+    return {
+        'requests': len(durations),
+        'errors': sum(status >= 400 for status in statuses),
+        'p50_ms': round(percentile(durations, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 3),
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 3),
+        'rps': round(len(durations) / elapsed, 1),
+        'queries': max(queries) if queries else None,
+    }
+
+
+def run_in_process(scenario, token, requests, warmup, seed):
+    rng = random.Random(seed)
+    client = Client(HTTP_HOST=get_host(),
+                    HTTP_AUTHORIZATION=f'Token {token}')
+    for _ in range(warmup):
+        client.get(scenario(rng))
+    durations, queries, statuses = [], [], []
+    started = time.perf_counter()
+    for _ in range(requests):
+        path = scenario(rng)
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            durations.append(time.perf_counter() - start)
+        queries.append(len(context.captured_queries))
+        statuses.append(response.status_code)
+    return summarize(durations, queries, statuses,
+                     time.perf_counter() - started)
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    def __init__(self, workers, database_name, asgi=False):
+        self.workers = workers
+        self.database_name = database_name
+        self.asgi = asgi
+        self.port = get_free_port()
+        self.process = None
+
+    def get_application(self):
+        if self.asgi:
+            return ['--worker-class', ASGI_WORKER, 'backend.asgi:application']
+        return ['backend.wsgi']
+
+    def __enter__(self):
+        env = dict(os.environ, POSTGRES_DB=self.database_name,
+                   METRICS_SAMPLE_RATE='1', METRICS_SERVER_TIMING='True',
+                   ASYNC_READ_VIEWS=str(self.asgi))
+        for name in REPLICA_ENV:
+            env.pop(name, None)
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers',
+             str(self.workers), '--bind', f'127.0.0.1:{self.port}',
+             '--log-level', 'warning', *self.get_application()],
+            cwd=settings.BASE_DIR, env=env)
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), 1).close()
+                return self
+            except OSError:
+                if self.process.poll() is not None:
+                    break
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError('gunicorn не запустился')
+
+    def __exit__(self, *args):
+        self.process.terminate()
+        self.process.wait()
+
+    def fetch(self, path, token):
+        request = urllib.request.Request(
+            f'http://127.0.0.1:{self.port}'
+            f'{urllib.parse.quote(path, safe="/?=&")}',
+            headers={'Host': get_host(),
+                     'Authorization': f'Token {token}'})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                status, timing = (response.status,
+                                  response.headers.get('Server-Timing', ''))
+        except urllib.error.HTTPError as error:
+            status, timing = error.code, ''
+        duration = time.perf_counter() - start
+        match = QUERIES_RE.search(timing)
+        return duration, match and int(match.group(1)), status
+
+
+def run_on_server(server, scenario, token, requests, warmup, seed,
+                  concurrency):
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        server.fetch(scenario(rng), token)
+    paths = [scenario(rng) for _ in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(
+            lambda path: server.fetch(path, token), paths))
+    elapsed = time.perf_counter() - started
+    durations, queries, statuses = zip(*results)
+    return summarize(durations, [count for count in queries
+                                 if count is not None], statuses, elapsed)
+
+
+def build_report(config, results):
+    commit, dirty = get_commit()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'database': connection.vendor,
+        'config': config,
+        'results': results,
+    }
+
+
+def compare(report, baseline):
+    lines = [f'{"scenario":<28}{"p50 ms":>18}{"p99 ms":>18}{"rps":>18}'
+             f'{"queries":>10}']
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        cells = []
+        for field in ('p50_ms', 'p99_ms', 'rps'):
+            value = result[field]
+            if base and base.get(field):
+                change = (value - base[field]) / base[field] * 100
+                cells.append(f'{value:>9} {change:>+6.1f}%')
+            else:
+                cells.append(f'{value:>9}        ')
+        queries = result['queries']
+        if base and base.get('queries') != queries:
+            queries = f'{base.get("queries")}->{queries}'
+        lines.append(f'{name:<28}' + ''.join(f'{cell:>18}' for cell in cells)
+                     + f'{queries!s:>10}')
+    return '\n'.join(lines)
+
+
+def format_report(report):
+    lines = [f'commit {report["commit"]}'
+             f'{" (dirty)" if report["dirty"] else ""}, '
+             f'{report["database"]}',
+             f'{"scenario":<28}{"p50 ms":>10}{"p99 ms":>10}{"rps":>10}'
+             f'{"queries":>10}{"errors":>8}']
+    for name, result in report['results'].items():
+        lines.append(f'{name:<28}{result["p50_ms"]:>10}'
+                     f'{result["p99_ms"]:>10}{result["rps"]:>10}'
+                     f'{result["queries"]!s:>10}{result["errors"]:>8}')
+    return '\n'.join(lines)
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
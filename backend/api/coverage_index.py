@@ -0,0 +1,111 @@
+from collections import Counter, defaultdict
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+
+from api.replicas import PRIMARY
+from recipes.constants import MAX_INDEX_CHANGES
+from recipes.models import IngredientsInRecipe
+
+SEQUENCE_KEY = 'coverage:sequence'
+
+
+def get_change_key(sequence):
+    return f'coverage:change:{sequence}'
+
+
+def get_sequence():
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    return cache.get(SEQUENCE_KEY)
+
+
+def record_changes(recipe_ids):
+    def record():
+        get_sequence()
+        try:
+            sequence = cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            return
+        cache.set(get_change_key(sequence), list(recipe_ids), timeout=None)
+    transaction.on_commit(record)
+
+
+def invalidate_index():
+    get_sequence()
+    cache.incr(SEQUENCE_KEY, MAX_INDEX_CHANGES + 1)
+
+
+def load_ingredients(recipe_ids=None):
+    rows = IngredientsInRecipe.objects.using(PRIMARY).order_by()
+    if recipe_ids is not None:
+        rows = rows.filter(recipe_id__in=recipe_ids)
+    ingredients = defaultdict(set)
+    for recipe_id, ingredient_id in rows.values_list('recipe_id',
+                                                     'ingredients_id'):
+        ingredients[recipe_id].add(ingredient_id)
+    return ingredients
+
+
+class RecipeCoverageIndex:
+    def __init__(self):
+        self._lock = Lock()
+        self._sequence = None
+        self._recipes = {}
+        self._postings = defaultdict(set)
+
+    def _set_recipe(self, recipe_id, ingredient_ids):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            self._postings[ingredient_id].discard(recipe_id)
+        if ingredient_ids:
+            self._recipes[recipe_id] = frozenset(ingredient_ids)
+            for ingredient_id in ingredient_ids:
+                self._postings[ingredient_id].add(recipe_id)
+
+    def _rebuild(self, sequence):
+        self._recipes = {}
+        self._postings = defaultdict(set)
+        for recipe_id, ingredient_ids in load_ingredients().items():
+            self._set_recipe(recipe_id, ingredient_ids)
+        self._sequence = sequence
+
+    def _apply_changes(self, sequence):
+        if (self._sequence is None or sequence < self._sequence
+                or sequence - self._sequence > MAX_INDEX_CHANGES):
+            return self._rebuild(sequence)
+        keys = [get_change_key(number)
+                for number in range(self._sequence + 1, sequence + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return self._rebuild(sequence)
+        recipe_ids = {recipe_id for changed in changes.values()
+                      for recipe_id in changed}
+        ingredients = load_ingredients(recipe_ids)
+        for recipe_id in recipe_ids:
+            self._set_recipe(recipe_id, ingredients.get(recipe_id))
+        self._sequence = sequence
+
+    def refresh(self):
+        sequence = get_sequence()
+        if sequence != self._sequence:
+            with self._lock:
+                if sequence != self._sequence:
+                    self._apply_changes(sequence)
+
+    def search(self, ingredient_ids, max_missing=None):
+        self.refresh()
+        with self._lock:
+            matches = Counter()
+            for ingredient_id in set(ingredient_ids):
+                matches.update(self._postings.get(ingredient_id, ()))
+            found = []
+            for recipe_id, count in matches.items():
+                total = len(self._recipes[recipe_id])
+                missing = total - count
+                if max_missing is None or missing <= max_missing:
+                    found.append((-count / total, missing, -recipe_id))
+        return [{'id': -recipe_id, 'coverage': -coverage, 'missing': missing}
+                for coverage, missing, recipe_id in sorted(found)]
+
+
+coverage_index = RecipeCoverageIndex()
@@ -1,20 +1,63 @@
-import django_filters
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
+from api.replicas import PRIMARY
+from api.versions import CATALOG, get_version
 from recipes.models import Recipe, Tag
 
+RecipeTags = Recipe.tags.through
+
+TAGS_MATCH_ANY = 'any'
+TAGS_MATCH_ALL = 'all'
+TAGS_MATCH_CHOICES = (
+    (TAGS_MATCH_ANY, 'Любой из тегов'),
+    (TAGS_MATCH_ALL, 'Все теги'),
+)
+
+
+def get_tag_ids():
+    key = f'tag_ids:{get_version(CATALOG)}'
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.using(PRIMARY).values_list('slug', 'id'))
+        cache.set(key, tag_ids)
+    return tag_ids
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
+
 
 class RecipeFilter(FilterSet):
-    tags = django_filters.ModelMultipleChoiceFilter(field_name='tags__slug',
-                                                    to_field_name='slug',
-                                                    queryset=Tag.objects.all())
+    tags = filters.MultipleChoiceFilter(choices=get_tag_choices,
+                                        method='filter_tags')
+    tags_match = filters.ChoiceFilter(choices=TAGS_MATCH_CHOICES,
+                                      method='match_tags')
 
     is_favorited = filters.BooleanFilter(method='favorited')
     is_in_shopping_cart = filters.BooleanFilter(method='in_shopping_cart')
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['author', 'tags', 'tags_match', 'is_favorited',
+                  'is_in_shopping_cart']
+
+    def filter_tags(self, queryset, name, value):
+        tag_ids = get_tag_ids()
+        tag_ids = {tag_ids[slug] for slug in value if slug in tag_ids}
+        if not tag_ids:
+            return queryset
+        recipe_tags = RecipeTags.objects.filter(recipe_id=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_match') == TAGS_MATCH_ALL:
+            return queryset.filter(*(
+                Exists(recipe_tags.filter(tag_id=tag_id))
+                for tag_id in tag_ids))
+        return queryset.filter(Exists(recipe_tags.filter(
+            tag_id__in=tag_ids)))
+
+    def match_tags(self, queryset, name, value):
+        return queryset
 
     def favorited(self, queryset, name, value):
         if value:
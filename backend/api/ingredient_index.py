@@ -0,0 +1,45 @@
+from bisect import bisect_left
+from threading import Lock
+
+from api.replicas import PRIMARY
+from api.versions import CATALOG, get_version
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = Lock()
+        self._index = None
+
+    def _build(self, version):
+        ingredients = sorted(
+            Ingredient.objects.using(PRIMARY).order_by().values(
+                'id', 'name', 'measurement_unit'),
+            key=lambda ingredient: (ingredient['name'].lower(),
+                                    ingredient['measurement_unit']))
+        keys = [ingredient['name'].lower() for ingredient in ingredients]
+        return version, keys, ingredients
+
+    def get_index(self):
+        version = get_version(CATALOG)
+        index = self._index
+        if index is None or index[0] != version:
+            with self._lock:
+                if self._index is None or self._index[0] != version:
+                    self._index = self._build(version)
+                index = self._index
+        return index
+
+    def search(self, prefix, limit=None):
+        _, keys, ingredients = self.get_index()
+        prefix = prefix.lower()
+        found = []
+        position = bisect_left(keys, prefix)
+        while (position < len(keys) and keys[position].startswith(prefix)
+               and (limit is None or len(found) < limit)):
+            found.append(ingredients[position])
+            position += 1
+        return found
+
+
+ingredient_index = IngredientIndex()
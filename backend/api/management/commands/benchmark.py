@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+
+from api import benchmarks
+from recipes.fake_data import CATALOG_PATH, FakeDataGenerator
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Заполняет тестовую базу синтетическими данными и замеряет '
+            'задержку, пропускную способность и число запросов к БД')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=5000)
+        parser.add_argument('--shopping-carts', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--catalog', default=str(CATALOG_PATH))
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--scenario', action='append')
+        parser.add_argument('--server', action='store_true',
+                            help='Также прогнать сценарии через gunicorn')
+        parser.add_argument('--asgi', action='store_true',
+                            help='Также прогнать сценарии через uvicorn '
+                                 'с асинхронными представлениями')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--output')
+        parser.add_argument('--compare')
+
+    def seed(self, options):
+        call_command('import_catalog', options['catalog'],
+                     stdout=self.stdout)
+        try:
+            FakeDataGenerator(options['seed'],
+                              log=self.stdout.write).generate(
+                options['users'], options['recipes'],
+                options['ingredients_per_recipe'], options['favorites'],
+                options['follows'], options['shopping_carts'])
+        except ValueError as error:
+            raise CommandError(error)
+
+    def run_scenarios(self, options, token):
+        scenarios = benchmarks.get_scenarios()
+        names = options['scenario'] or list(scenarios)
+        unknown = set(names) - set(scenarios)
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: '
+                               f'{", ".join(sorted(unknown))}')
+        results = {}
+        for name in names:
+            results[name] = benchmarks.run_in_process(
+                scenarios[name], token, options['requests'],
+                options['warmup'], options['seed'])
+        for suffix, asgi in (('server', False), ('asgi', True)):
+            if not options[suffix]:
+                continue
+            with benchmarks.Server(options['workers'],
+                                   connection.settings_dict['NAME'],
+                                   asgi) as server:
+                for name in names:
+                    results[f'{name}@{suffix}'] = benchmarks.run_on_server(
+                        server, scenarios[name], token, options['requests'],
+                        options['warmup'], options['seed'],
+                        options['concurrency'])
+        return results
+
+    @override_settings(DATABASE_ROUTERS=[])
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+            keepdb=options['keepdb'])
+        try:
+            if ((options['server'] or options['asgi'])
+                    and connection.vendor == 'sqlite'
+                    and connection.is_in_memory_db()):
+                raise CommandError('Для --server и --asgi нужна база на '
+                                   'диске')
+            if not Recipe.objects.exists():
+                self.seed(options)
+            if not Recipe.objects.exists():
+                raise CommandError('Нет рецептов для замеров: задайте '
+                                   '--recipes больше нуля')
+            for alias in settings.CACHES:
+                caches[alias].clear()
+            user = (User.objects.filter(
+                follower__isnull=False).order_by('id').first()
+                or User.objects.order_by('id').first())
+            token, _ = Token.objects.get_or_create(user=user)
+            config = {key: options[key] for key in (
+                'users', 'recipes', 'ingredients_per_recipe', 'favorites',
+                'shopping_carts', 'follows', 'seed', 'requests', 'warmup',
+                'workers', 'concurrency', 'asgi')}
+            report = benchmarks.build_report(
+                config, self.run_scenarios(options, token.key))
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+        if options['output']:
+            benchmarks.save_report(report, options['output'])
+        self.stdout.write(benchmarks.format_report(report))
+        if options['compare']:
+            self.stdout.write(benchmarks.compare(
+                report, benchmarks.load_report(options['compare'])))
@@ -0,0 +1,228 @@
+import random
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from api.utils import AsyncCapableMiddleware
+
+FIELDS = ('requests', 'errors', 'duration', 'queries', 'db_time',
+          'render_time', 'response_size')
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+VIEWS_KEY = 'metrics:views'
+MICROSECONDS = 10 ** 6
+
+current_timer = ContextVar('current_timer', default=None)
+
+
+def get_metric_key(view, method, field):
+    return f'metrics:{view}:{method}:{field}'
+
+
+def get_bucket_field(bucket):
+    return f'le_{bucket}'
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def time_query(execute, sql, params, many, context):
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timer(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = Lock()
+        self._pending = defaultdict(int)
+        self._views = set()
+        self._flushed = time.monotonic()
+
+    def record(self, view, method, status, duration, queries, db_time,
+               render_time, response_size):
+        values = {
+            'requests': 1,
+            'errors': int(status >= 500),
+            'duration': duration,
+            'queries': queries,
+            'db_time': db_time,
+            'render_time': render_time,
+            'response_size': response_size,
+        }
+        for bucket in BUCKETS:
+            if duration <= bucket:
+                values[get_bucket_field(bucket)] = 1
+        with self._lock:
+            self._views.add((view, method))
+            for field, value in values.items():
+                if field in ('duration', 'db_time', 'render_time'):
+                    value = round(value * MICROSECONDS)
+                self._pending[get_metric_key(view, method, field)] += value
+        if (time.monotonic() - self._flushed
+                >= settings.METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            views = set(self._views)
+            self._flushed = time.monotonic()
+        for key, value in pending.items():
+            if value and not cache.add(key, value, timeout=None):
+                try:
+                    cache.incr(key, value)
+                except ValueError:
+                    cache.set(key, value, timeout=None)
+        known = cache.get(VIEWS_KEY, set())
+        if not views <= known:
+            cache.set(VIEWS_KEY, known | views, timeout=None)
+
+    def collect(self):
+        self.flush()
+        views = sorted(cache.get(VIEWS_KEY, set()))
+        fields = FIELDS + tuple(get_bucket_field(bucket)
+                                for bucket in BUCKETS)
+        values = cache.get_many([get_metric_key(view, method, field)
+                                 for view, method in views
+                                 for field in fields])
+        return {(view, method): {
+            field: values.get(get_metric_key(view, method, field), 0)
+            for field in fields} for view, method in views}
+
+
+registry = MetricsRegistry()
+
+
+def get_labels(view, method, **extra):
+    labels = dict(view=view, method=method, **extra)
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def render_metrics():
+    metrics = registry.collect()
+    lines = [
+        '# HELP foodgram_metrics_sample_rate Share of requests measured.',
+        '# TYPE foodgram_metrics_sample_rate gauge',
+        f'foodgram_metrics_sample_rate {settings.METRICS_SAMPLE_RATE}',
+    ]
+    counters = (
+        ('requests_total', 'requests', 1, 'Sampled requests.'),
+        ('errors_total', 'errors', 1, 'Sampled 5xx responses.'),
+        ('db_queries_total', 'queries', 1, 'SQL queries.'),
+        ('db_duration_seconds_total', 'db_time', MICROSECONDS,
+         'Time spent in SQL queries.'),
+        ('render_duration_seconds_total', 'render_time', MICROSECONDS,
+         'Time spent rendering responses.'),
+        ('response_bytes_total', 'response_size', 1,
+         'Response body size.'),
+    )
+    for name, field, scale, description in counters:
+        lines.append(f'# HELP foodgram_{name} {description}')
+        lines.append(f'# TYPE foodgram_{name} counter')
+        for (view, method), values in metrics.items():
+            value = values[field] / scale if scale > 1 else values[field]
+            lines.append(f'foodgram_{name}{{{get_labels(view, method)}}} '
+                         f'{value}')
+    name = 'foodgram_request_duration_seconds'
+    lines.append(f'# HELP {name} Request duration.')
+    lines.append(f'# TYPE {name} histogram')
+    for (view, method), values in metrics.items():
+        for bucket in BUCKETS:
+            labels = get_labels(view, method, le=bucket)
+            lines.append(f'{name}_bucket{{{labels}}} '
+                         f'{values[get_bucket_field(bucket)]}')
+        labels = get_labels(view, method, le='+Inf')
+        lines.append(f'{name}_bucket{{{labels}}} {values["requests"]}')
+        labels = get_labels(view, method)
+        lines.append(f'{name}_sum{{{labels}}} '
+                     f'{values["duration"] / MICROSECONDS}')
+        lines.append(f'{name}_count{{{labels}}} {values["requests"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def get_server_timing(duration, queries, db_time, render_time):
+    app_time = max(duration - db_time - render_time, 0)
+    return ', '.join((
+        f'db;dur={db_time * 1000:.1f};desc="{queries} queries"',
+        f'app;dur={app_time * 1000:.1f}',
+        f'render;dur={render_time * 1000:.1f}',
+        f'total;dur={duration * 1000:.1f}',
+    ))
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        timer, token, start = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        self.finish(request, response, timer, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return await self.get_response(request)
+        timer, token, start = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        await sync_to_async(self.finish, thread_sensitive=False)(
+            request, response, timer, time.perf_counter() - start)
+        return response
+
+    def start(self, request):
+        request.metrics_render_time = 0
+        timer = QueryTimer()
+        return timer, current_timer.set(timer), time.perf_counter()
+
+    def finish(self, request, response, timer, duration):
+        match = request.resolver_match
+        response_size = (int(response.get('Content-Length', 0))
+                         if response.streaming else len(response.content))
+        registry.record(
+            match.view_name if match else 'unmatched', request.method,
+            response.status_code, duration, timer.count, timer.duration,
+            request.metrics_render_time, response_size)
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = get_server_timing(
+                duration, timer.count, timer.duration,
+                request.metrics_render_time)
+
+    def process_template_response(self, request, response):
+        if (hasattr(request, 'metrics_render_time')
+                and not response.is_rendered):
+            start = time.perf_counter()
+
+            def finish(response):
+                request.metrics_render_time = time.perf_counter() - start
+
+            response.add_post_render_callback(finish)
+        return response
@@ -0,0 +1,45 @@
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       LimitOffsetPagination,
+                                       PageNumberPagination)
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class IdCursorPagination(CursorPagination):
+    ordering = ('-id',)
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class OptInCursorPagination(BasePagination):
+    mode_query_param = 'pagination'
+    default_class = None
+    cursor_class = None
+
+    def get_paginator_class(self, request):
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.cursor_class.cursor_query_param
+                in request.query_params):
+            return self.cursor_class
+        return self.default_class
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator_class(request)()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+
+class RecipePagination(OptInCursorPagination):
+    default_class = PageNumberPagination
+    cursor_class = RecipeCursorPagination
+
+
+class UserPagination(OptInCursorPagination):
+    default_class = LimitOffsetPagination
+    cursor_class = IdCursorPagination
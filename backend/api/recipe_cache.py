@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from api import versions
+from api.relations import CACHE_ALIAS, get_relations
+from api.replicas import PRIMARY
+from api.serializers import RecipeSerializer
+from recipes.models import Recipe
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_recipe_version_name(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def invalidate_recipes(recipe_ids):
+    names = [get_recipe_version_name(recipe_id) for recipe_id in recipe_ids]
+    transaction.on_commit(lambda: versions.bump_versions(names))
+
+
+def get_recipe_versions(recipe_ids):
+    recipe_versions = versions.get_versions(
+        get_recipe_version_name(recipe_id) for recipe_id in recipe_ids)
+    return {recipe_id: recipe_versions[get_recipe_version_name(recipe_id)]
+            for recipe_id in recipe_ids}
+
+
+def get_recipe_keys(recipe_versions):
+    catalog = versions.get_version(versions.CATALOG)
+    return {recipe_id: f'recipe:{catalog}:{recipe_id}:{version}'
+            for recipe_id, version in recipe_versions.items()}
+
+
+def load_recipes(recipe_ids, using=None):
+    recipes = Recipe.objects.using(using).with_related().filter(
+        id__in=recipe_ids)
+    return {recipe['id']: recipe
+            for recipe in RecipeSerializer(recipes, many=True).data}
+
+
+def load_missing(recipe_versions):
+    changed = [recipe_id for recipe_id, version in recipe_versions.items()
+               if versions.is_recent(version,
+                                     settings.DATABASE_REPLICA_LAG)]
+    loaded = load_recipes(changed, PRIMARY) if changed else {}
+    rest = [recipe_id for recipe_id in recipe_versions
+            if recipe_id not in changed]
+    if rest:
+        loaded.update(load_recipes(rest))
+    return loaded
+
+
+def build_absolute_urls(urls, request):
+    if isinstance(urls, dict):
+        return {key: build_absolute_urls(url, request)
+                for key, url in urls.items()}
+    return urls and request.build_absolute_uri(urls)
+
+
+def get_recipes(recipe_ids, request):
+    recipe_versions = get_recipe_versions(recipe_ids)
+    keys = get_recipe_keys(recipe_versions)
+    cached = get_cache().get_many(keys.values())
+    missing = {recipe_id: version
+               for recipe_id, version in recipe_versions.items()
+               if keys[recipe_id] not in cached}
+    if missing:
+        loaded = {keys[recipe_id]: recipe for recipe_id, recipe
+                  in load_missing(missing).items()}
+        get_cache().set_many(loaded)
+        cached.update(loaded)
+
+    relations = get_relations(request)
+    recipes = []
+    for recipe_id in recipe_ids:
+        recipe = cached.get(keys[recipe_id])
+        if recipe is None:
+            continue
+        recipes.append(dict(
+            recipe,
+            author=dict(recipe['author'],
+                        is_subscribed=recipe['author']['id']
+                        in relations.following),
+            image=build_absolute_urls(recipe['image'], request),
+            image_variants=build_absolute_urls(recipe['image_variants'],
+                                               request),
+            is_favorited=recipe_id in relations.favorites,
+            is_in_shopping_cart=recipe_id in relations.shopping_cart))
+    return recipes
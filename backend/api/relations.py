@@ -0,0 +1,63 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import transaction
+
+from api import versions
+from api.replicas import PRIMARY
+from recipes.models import FavoriteRecipe, ListProducts
+from users.models import Follow
+
+CACHE_ALIAS = 'recipes'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_relations_version_name(user_id):
+    return f'relations:{user_id}'
+
+
+def get_relations_key(user_id):
+    version = versions.get_version(get_relations_version_name(user_id))
+    return f'relations:{user_id}:{version}'
+
+
+def invalidate_relations(user_id):
+    transaction.on_commit(lambda: versions.bump_version(
+        get_relations_version_name(user_id)))
+
+
+def load_relations(user):
+    if not user.is_authenticated:
+        return (), (), ()
+    key = get_relations_key(user.id)
+    relations = get_cache().get(key)
+    if relations is None:
+        relations = (
+            list(FavoriteRecipe.objects.using(PRIMARY).filter(
+                user=user).values_list('recipe_id', flat=True)),
+            list(ListProducts.objects.using(PRIMARY).filter(
+                user=user).values_list('recipe_id', flat=True)),
+            list(Follow.objects.using(PRIMARY).filter(
+                user=user).values_list('author_id', flat=True)),
+        )
+        get_cache().set(key, relations)
+    return relations
+
+
+class UserRelations:
+    def __init__(self, user):
+        favorites, shopping_cart, following = load_relations(user)
+        self.favorites = frozenset(favorites)
+        self.shopping_cart = frozenset(shopping_cart)
+        self.following = frozenset(following)
+
+
+def get_relations(request):
+    if request is None:
+        return UserRelations(AnonymousUser())
+    relations = getattr(request, 'user_relations', None)
+    if relations is None:
+        relations = request.user_relations = UserRelations(request.user)
+    return relations
@@ -0,0 +1,133 @@
+import hashlib
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import Resolver404, resolve
+
+from api import versions
+from api.utils import AsyncCapableMiddleware
+
+PRIMARY = DEFAULT_DB_ALIAS
+REPLICA = 'replica'
+REPLICA_BASENAMES = ('recipe', 'tag', 'ingredient', 'user')
+CATALOG_BASENAMES = ('tag', 'ingredient')
+PRIMARY_APP_LABELS = ('django_cache',)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_enabled():
+    return REPLICA in settings.DATABASES
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return check_health(self.get_read_alias(model, **hints))
+
+    def db_for_write(self, model, **hints):
+        return check_health(PRIMARY)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def get_read_alias(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if model._meta.app_label in PRIMARY_APP_LABELS:
+            return PRIMARY
+        if use_replica.get() and replica_enabled():
+            return REPLICA
+        return PRIMARY
+
+
+def get_client_keys(request):
+    identities = (request.META.get('HTTP_AUTHORIZATION'),
+                  request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    return ['primary:' + hashlib.sha256(identity.encode()).hexdigest()
+            for identity in identities if identity]
+
+
+def is_pinned(request):
+    return bool(cache.get_many(get_client_keys(request)))
+
+
+def pin_to_primary(request):
+    cache.set_many(dict.fromkeys(get_client_keys(request), True),
+                   timeout=settings.DATABASE_REPLICA_LAG)
+
+
+def get_basename(request):
+    try:
+        match = resolve(request.path_info, getattr(request, 'urlconf', None))
+    except Resolver404:
+        return None
+    return match.url_name and match.url_name.split('-')[0]
+
+
+def is_catalog_recent():
+    return versions.is_recent(versions.get_version(versions.CATALOG),
+                              settings.DATABASE_REPLICA_LAG)
+
+
+def should_use_replica(request):
+    if request.method not in SAFE_METHODS:
+        return False
+    basename = get_basename(request)
+    if basename not in REPLICA_BASENAMES:
+        return False
+    if basename in CATALOG_BASENAMES and is_catalog_recent():
+        return False
+    return not is_pinned(request)
+
+
+class ReplicaMiddleware(AsyncCapableMiddleware):
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not replica_enabled():
+            return self.get_response(request)
+        token = use_replica.set(should_use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(request)
+        return response
+
+    async def __acall__(self, request):
+        if not replica_enabled():
+            return await self.get_response(request)
+        token = use_replica.set(await sync_to_async(
+            should_use_replica, thread_sensitive=False)(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if request.method not in SAFE_METHODS:
+            await sync_to_async(pin_to_primary, thread_sensitive=False)(
+                request)
+        return response
+
+
+def check_health(alias):
+    connection = connections[alias]
+    if getattr(connection, 'health_check_needed', False):
+        connection.health_check_needed = False
+        if (connection.connection is not None
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
+    return alias
+
+
+def reset_health_checks(**kwargs):
+    for connection in connections.all():
+        connection.health_check_needed = bool(
+            connection.connection is not None
+            and connection.settings_dict['CONN_MAX_AGE'])
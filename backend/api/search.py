@@ -0,0 +1,137 @@
+import re
+from collections import defaultdict
+from threading import Lock
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from api.replicas import PRIMARY
+from api.versions import bump_version, get_version
+from recipes.constants import SEARCH_CONFIG, SEARCH_SIMILARITY
+from recipes.models import IngredientsInRecipe, Recipe
+
+SEARCH = 'search'
+WEIGHTS = {'name': 1.0, 'text': 0.4, 'ingredients': 0.2}
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def get_trigrams(text):
+    trigrams = set()
+    for word in tokenize(text):
+        word = f'  {word} '
+        trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+def get_similarity(first, second):
+    if not first or not second:
+        return 0
+    return len(first & second) / len(first | second)
+
+
+def uses_database_search():
+    return connection.vendor == 'postgresql'
+
+
+def invalidate_search(recipe_ids):
+    def update():
+        if uses_database_search():
+            Recipe.objects.filter(id__in=recipe_ids).update_search_vectors()
+        bump_version(SEARCH)
+    transaction.on_commit(update)
+
+
+class RecipeSearchIndex:
+    def __init__(self):
+        self._lock = Lock()
+        self._index = None
+
+    def _build(self, version):
+        recipes = list(Recipe.objects.using(PRIMARY).values_list(
+            'id', 'name', 'text'))
+        ingredient_names = defaultdict(list)
+        for recipe_id, name in IngredientsInRecipe.objects.using(
+                PRIMARY).values_list('recipe_id', 'ingredients__name'):
+            ingredient_names[recipe_id].append(name)
+        postings = defaultdict(dict)
+        names = {}
+        for position, (recipe_id, name, text) in enumerate(recipes):
+            names[recipe_id] = (get_trigrams(name), position)
+            fields = {'name': name, 'text': text,
+                      'ingredients': ' '.join(ingredient_names[recipe_id])}
+            for field, value in fields.items():
+                for token in tokenize(value):
+                    found = postings[token]
+                    found[recipe_id] = max(found.get(recipe_id, 0),
+                                           WEIGHTS[field])
+        vocabulary = {token: get_trigrams(token) for token in postings}
+        return version, postings, vocabulary, names
+
+    def get_index(self):
+        version = get_version(SEARCH)
+        index = self._index
+        if index is None or index[0] != version:
+            with self._lock:
+                if self._index is None or self._index[0] != version:
+                    self._index = self._build(version)
+                index = self._index
+        return index
+
+    def match_term(self, term, postings, vocabulary):
+        trigrams = get_trigrams(term)
+        ranks = {}
+        for token, token_trigrams in vocabulary.items():
+            if token.startswith(term):
+                factor = 1
+            else:
+                factor = get_similarity(trigrams, token_trigrams)
+                if factor < SEARCH_SIMILARITY:
+                    continue
+            for recipe_id, weight in postings[token].items():
+                ranks[recipe_id] = max(ranks.get(recipe_id, 0),
+                                       weight * factor)
+        return ranks
+
+    def search(self, query):
+        _, postings, vocabulary, names = self.get_index()
+        ranks = None
+        for term in tokenize(query):
+            term_ranks = self.match_term(term, postings, vocabulary)
+            ranks = term_ranks if ranks is None else {
+                recipe_id: rank + term_ranks[recipe_id]
+                for recipe_id, rank in ranks.items()
+                if recipe_id in term_ranks}
+        ranks = ranks or {}
+        query_trigrams = get_trigrams(query)
+        found = []
+        for recipe_id, (trigrams, position) in names.items():
+            similarity = get_similarity(query_trigrams, trigrams)
+            if recipe_id in ranks or similarity >= SEARCH_SIMILARITY:
+                found.append((-ranks.get(recipe_id, 0), -similarity,
+                              position, recipe_id))
+        return [recipe_id for *_, recipe_id in sorted(found)]
+
+
+recipe_search_index = RecipeSearchIndex()
+
+
+def search_recipes(queryset, query):
+    if uses_database_search():
+        search_query = SearchQuery(query, config=SEARCH_CONFIG)
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+            similarity=TrigramSimilarity('name', query),
+        ).filter(
+            Q(search_vector=search_query) | Q(name__trigram_similar=query)
+        ).order_by('-rank', '-similarity', '-pub_date', '-id').values_list(
+            'id', flat=True)
+    recipe_ids = recipe_search_index.search(query)
+    allowed = set(queryset.filter(id__in=recipe_ids).values_list(
+        'id', flat=True))
+    return [recipe_id for recipe_id in recipe_ids if recipe_id in allowed]
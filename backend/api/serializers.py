@@ -1,7 +1,5 @@
-import base64
-
-from django.core.files.base import ContentFile
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import transaction
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
@@ -9,14 +7,29 @@ from rest_framework.fields import (SerializerMethodField, IntegerField,
                                    ImageField, ReadOnlyField)
 from rest_framework.relations import PrimaryKeyRelatedField
 
+from api.relations import get_relations
+from api.uploads import decode_image
+from jobs.models import Job
 from recipes.models import (Ingredient, Tag, Recipe, IngredientsInRecipe,
-                            FavoriteRecipe, ListProducts)
-from recipes.constants import (MAX_COOKING_TIME, MIN_AMMOUNT_INGREDIENTS,
+                            FavoriteRecipe)
+from recipes.constants import (MAX_AVAILABLE_INGREDIENTS, MAX_BULK_RECIPES,
+                               MAX_COOKING_TIME, MIN_AMMOUNT_INGREDIENTS,
                                MIN_COOKING_TIME)
+from recipes.images import get_variant_names
 from users.models import Follow
 from users.serializers import CustomUserSerializer
 
 
+def get_recipes_limit(request):
+    limit = request.query_params.get('recipes_limit')
+    if limit is None:
+        return None
+    if not limit.isdigit():
+        raise ValidationError('Параметр recipes_limit должен быть '
+                              'неотрицательным числом!')
+    return int(limit)
+
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
@@ -42,17 +55,34 @@ class IngredientsInRecipeSerializer(serializers.ModelSerializer):
 class Base64ImageField(ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = decode_image(data)
         return super().to_internal_value(data)
 
 
+class ImageVariantsField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs.update(source='*', read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        image = recipe.image
+        if not image:
+            return None
+        request = self.context.get('request')
+        return {extension: {
+            str(width): (request.build_absolute_uri(image.storage.url(name))
+                         if request else image.storage.url(name))
+            for width, name in names.items()}
+            for extension, names in get_variant_names(
+                image.name, recipe.image_widths).items()}
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = CustomUserSerializer()
     ingredients = SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
     cooking_time = serializers.IntegerField(
@@ -61,36 +91,29 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ('id', 'author', 'tags', 'ingredients', 'image', 'name',
-                  'text', 'cooking_time', 'is_favorited',
-                  'is_in_shopping_cart')
+        fields = ('id', 'author', 'tags', 'ingredients', 'image',
+                  'image_variants', 'name', 'text', 'cooking_time',
+                  'is_favorited', 'is_in_shopping_cart')
 
     def get_ingredients(self, recipe):
-        ingredients = recipe.ingredientsinrecipe_set.values(
-            'ingredients__id',
-            'ingredients__name',
-            'ingredients__measurement_unit',
-            'amount')
         form_ingredients = []
-        for ingredient in ingredients:
-            formatted_ingredient = {'id': ingredient['ingredients__id'],
-                                    'name': ingredient['ingredients__name'],
-                                    'measurement_unit': ingredient[
-                                        'ingredients__measurement_unit'],
-                                    'amount': ingredient['amount']}
+        for item in recipe.ingredientsinrecipe_set.all():
+            formatted_ingredient = {'id': item.ingredients.id,
+                                    'name': item.ingredients.name,
+                                    'measurement_unit': item.ingredients.
+                                    measurement_unit,
+                                    'amount': item.amount}
             form_ingredients.append(formatted_ingredient)
 
         return form_ingredients
 
     def get_is_favorited(self, recipe):
-        request = self.context.get('request')
-        return request.user.is_authenticated and FavoriteRecipe.objects.filter(
-            user=request.user, recipe=recipe).exists()
+        return recipe.id in get_relations(
+            self.context.get('request')).favorites
 
     def get_is_in_shopping_cart(self, recipe):
-        request = self.context.get('request')
-        return request.user.is_authenticated and ListProducts.objects.filter(
-            user=request.user, recipe=recipe).exists()
+        return recipe.id in get_relations(
+            self.context.get('request')).shopping_cart
 
 
 class NewRecipeSerializer(serializers.ModelSerializer):
@@ -111,71 +134,80 @@ class NewRecipeSerializer(serializers.ModelSerializer):
         if not cooking_time or not ingredients or not tags:
             raise ValidationError('Надо указать обязательные поля!')
 
-        list_ingredients = []
-        list_tags = []
-        list_id_ingredients = Ingredient.objects.values_list('id', flat=True)
-        for ingredient in ingredients:
-            ingredient_id = ingredient.get('id')
-            amount = ingredient.get('amount')
-            if ingredient_id not in list_id_ingredients:
-                raise ValidationError('Такого ингредиента нет!')
-            if amount < MIN_AMMOUNT_INGREDIENTS:
-                raise ValidationError(f'Кол-во ингредиента не может быть '
-                                      f'меньше {MIN_AMMOUNT_INGREDIENTS}!')
-            if ingredient in list_ingredients:
-                raise ValidationError('Такой ингредиент уже есть!')
-            list_ingredients.append(ingredient)
-
-        for tag in tags:
-            if tag in list_tags:
-                raise ValidationError('Такой тэг уже есть!')
-            list_tags.append(tag)
+        ingredient_ids = [ingredient['id'] for ingredient in ingredients]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise ValidationError('Такой ингредиент уже есть!')
+        if any(ingredient['amount'] < MIN_AMMOUNT_INGREDIENTS
+               for ingredient in ingredients):
+            raise ValidationError(f'Кол-во ингредиента не может быть '
+                                  f'меньше {MIN_AMMOUNT_INGREDIENTS}!')
+        if Ingredient.objects.filter(
+                id__in=ingredient_ids).count() != len(ingredient_ids):
+            raise ValidationError('Такого ингредиента нет!')
+        if len(set(tags)) != len(tags):
+            raise ValidationError('Такой тэг уже есть!')
         return data
 
+    def save(self, **kwargs):
+        recipe = super().save(**kwargs)
+        if self.validated_data.get('image'):
+            self.validated_data['image'].close()
+        return recipe
+
+    def set_ingredients(self, recipe, ingredients_data):
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(recipe=recipe, ingredients_id=item['id'],
+                                amount=item['amount'])
+            for item in ingredients_data)
+
+    @transaction.atomic
     def create(self, validated_data):
-        tags_data = validated_data.get('tags')
-        ingredients_data = validated_data.get('ingredients')
-        validated_data.pop('tags', None)
-        validated_data.pop('ingredients', None)
+        tags_data = validated_data.pop('tags')
+        ingredients_data = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags_data)
-        ingredients_in_recipe = []
-        for item in ingredients_data:
-            ingredient = Ingredient.objects.get(id=item['id'])
-            amount = item['amount']
-            ingredients_in_recipe.append(
-                IngredientsInRecipe(recipe=recipe, ingredients=ingredient,
-                                    amount=amount))
-        IngredientsInRecipe.objects.bulk_create(ingredients_in_recipe)
+        self.set_ingredients(recipe, ingredients_data)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        tags_data = validated_data.get('tags')
-        ingredients_data = validated_data.get('ingredients')
-        validated_data.pop('tags', None)
-        validated_data.pop('ingredients', None)
-        IngredientsInRecipe.objects.filter(recipe=recipe).delete()
-
+        tags_data = validated_data.pop('tags')
+        ingredients_data = validated_data.pop('ingredients')
         recipe = super().update(recipe, validated_data)
         recipe.tags.set(tags_data)
-
-        for item in ingredients_data:
-            ingredient = Ingredient.objects.get(id=item['id'])
-            amount = item['amount']
-            IngredientsInRecipe.objects.create(
-                recipe=recipe, ingredients=ingredient, amount=amount)
+        self.update_ingredients(recipe, ingredients_data)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients_data):
+        amounts = {item['id']: item['amount'] for item in ingredients_data}
+        current = {item.ingredients_id: item for item in
+                   IngredientsInRecipe.objects.filter(recipe=recipe)}
+        removed = [item.id for ingredient_id, item in current.items()
+                   if ingredient_id not in amounts]
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id, item.amount)
+            if item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        if removed:
+            IngredientsInRecipe.objects.filter(id__in=removed).delete()
+        IngredientsInRecipe.objects.bulk_update(changed, ['amount'])
+        self.set_ingredients(recipe, [item for item in ingredients_data
+                                      if item['id'] not in current])
+
     def to_representation(self, instance):
+        instance = Recipe.objects.with_related().get(pk=instance.pk)
         return RecipeSerializer(instance, context=self.context).data
 
 
 class RecipeFollowSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class FollowSerializer(UserSerializer):
@@ -188,34 +220,20 @@ class FollowSerializer(UserSerializer):
         fields = ('id', 'user', 'author',
                   'is_subscribed', 'recipes', 'recipes_count')
 
-    def validate(self, data):
-        instance = self.instance
-        user = instance.user
-        author = instance.author
-        if Follow.objects.filter(author=author, user=user).exists():
-            raise ValidationError('Уже есть такая подписка')
-        if user == author:
-            raise ValidationError('Нельзя подписаться на самого себя!')
-        return data
+    def get_is_subscribed(self, follow):
+        return follow.pk is not None
 
-    def get_is_subscribed(self, request):
-        return Follow.objects.filter(user=request.user,
-                                     author=request.author).exists()
+    def get_recipes(self, follow):
+        queryset = getattr(follow.author, 'limited_recipes', None)
+        if queryset is None:
+            limit = get_recipes_limit(self.context.get('request'))
+            queryset = Recipe.objects.filter(author=follow.author)[:limit]
+        return RecipeFollowSerializer(queryset, many=True).data
 
-    def get_recipes(self, data):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = (Recipe.objects.filter(author=data.author)[:int(limit)]
-                    if limit else Recipe.objects.filter(author=data.author))
-        recipes = RecipeFollowSerializer(queryset, many=True).data
-        return recipes
-
-    def get_recipes_count(self, data):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = (Recipe.objects.filter(author=data.author)[:int(limit)]
-                    if limit else Recipe.objects.filter(author=data.author))
-        return len(queryset)
+    def get_recipes_count(self, follow):
+        if hasattr(follow, 'recipes_count'):
+            return follow.recipes_count
+        return Recipe.objects.filter(author=follow.author).count()
 
     def to_representation(self, instance):
         representation = {
@@ -240,14 +258,6 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
         model = FavoriteRecipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
-    def validate(self, data):
-        instance = self.instance
-        recipe = instance.recipe.id
-        user = instance.user
-        if FavoriteRecipe.objects.filter(user=user, recipe_id=recipe).exists():
-            raise ValidationError('Рецепт уже есть в избранном')
-        return data
-
 
 class ListProductsSerializer(serializers.ModelSerializer):
     name = ReadOnlyField(source='recipe.name')
@@ -258,10 +268,34 @@ class ListProductsSerializer(serializers.ModelSerializer):
         model = FavoriteRecipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
-    def validate(self, data):
-        instance = self.instance
-        recipe = instance.recipe.id
-        user = instance.user
-        if ListProducts.objects.filter(user=user, recipe_id=recipe).exists():
-            raise ValidationError('Рецепт уже есть в корзине')
-        return data
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=IntegerField(min_value=1), allow_empty=False,
+        max_length=MAX_BULK_RECIPES)
+
+    def validate_recipes(self, recipes):
+        recipes = set(recipes)
+        request = self.context.get('request')
+        if request is not None and request.method == 'DELETE':
+            return sorted(recipes)
+        missing = recipes - set(Recipe.objects.filter(
+            id__in=recipes).values_list('id', flat=True))
+        if missing:
+            raise ValidationError(f'Таких рецептов нет: '
+                                  f'{", ".join(map(str, sorted(missing)))}')
+        return sorted(recipes)
+
+
+class AvailableIngredientsSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=IntegerField(min_value=1), allow_empty=False,
+        max_length=MAX_AVAILABLE_INGREDIENTS)
+    max_missing = IntegerField(min_value=0, required=False)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ('id', 'name', 'status', 'attempts', 'result', 'error',
+                  'created', 'updated')
@@ -0,0 +1,132 @@
+import json
+import os
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F, Sum
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.models import IngredientsInRecipe
+
+FILENAME = 'shopping_cart'
+STORAGE_DIR = 'shopping_carts'
+FONT_NAME = 'Arial'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'recipes', 'management',
+                         'ArialRegular.ttf')
+FONT_SIZE = 12
+LINE_HEIGHT = 20
+LEFT_MARGIN = 100
+TOP_POSITION = 780
+BOTTOM_MARGIN = 50
+CHUNK_SIZE = 64 * 1024
+MAX_MEMORY_SIZE = 1024 * 1024
+
+
+def get_shopping_list(user):
+    return IngredientsInRecipe.objects.filter(
+        recipe__listproducts__user=user
+    ).values(
+        name=F('ingredients__name'),
+        measurement_unit=F('ingredients__measurement_unit')
+    ).annotate(amount=Sum('amount')).order_by('name', 'measurement_unit')
+
+
+def format_line(ingredient):
+    return (f'- {ingredient["name"]}, '
+            f'{ingredient["amount"]}'
+            f'{ingredient["measurement_unit"]}')
+
+
+def can_stream(request):
+    return not isinstance(request, ASGIRequest)
+
+
+def attachment(content, content_type, extension, streaming):
+    response_class = StreamingHttpResponse if streaming else HttpResponse
+    response = response_class(content, content_type=content_type)
+    response['Content-Disposition'] = (f'attachment; filename="'
+                                       f'{FILENAME}.{extension}"')
+    return response
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+
+
+def write_pdf(ingredients, output):
+    register_font()
+    pdf = canvas.Canvas(output)
+    pdf.setFont(FONT_NAME, FONT_SIZE)
+    y_position = TOP_POSITION
+    for ingredient in ingredients:
+        if y_position < BOTTOM_MARGIN:
+            pdf.showPage()
+            pdf.setFont(FONT_NAME, FONT_SIZE)
+            y_position = TOP_POSITION
+        pdf.drawString(LEFT_MARGIN, y_position, format_line(ingredient))
+        y_position -= LINE_HEIGHT
+    pdf.showPage()
+    pdf.save()
+
+
+def read_chunks(file):
+    with file:
+        file.seek(0)
+        yield from iter(lambda: file.read(CHUNK_SIZE), b'')
+
+
+def render_pdf(ingredients, streaming=True):
+    output = SpooledTemporaryFile(max_size=MAX_MEMORY_SIZE)
+    write_pdf(ingredients.iterator(), output)
+    return attachment(read_chunks(output), 'application/pdf', 'pdf',
+                      streaming)
+
+
+def render_text(ingredients, streaming=True):
+    lines = (f'{format_line(ingredient)}\n'
+             for ingredient in ingredients.iterator())
+    return attachment(lines, 'text/plain; charset=utf-8', 'txt', streaming)
+
+
+def render_json(ingredients, streaming=True):
+    return JsonResponse(list(ingredients), safe=False,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def write_text(ingredients, output):
+    for ingredient in ingredients:
+        output.write(f'{format_line(ingredient)}\n'.encode())
+
+
+def write_json(ingredients, output):
+    output.write(json.dumps(list(ingredients), ensure_ascii=False).encode())
+
+
+def save_shopping_list(user, file_type):
+    with SpooledTemporaryFile(max_size=MAX_MEMORY_SIZE) as output:
+        WRITERS[file_type](get_shopping_list(user).iterator(), output)
+        output.seek(0)
+        return default_storage.save(
+            f'{STORAGE_DIR}/{uuid4().hex}.{file_type}', File(output))
+
+
+WRITERS = {
+    'pdf': write_pdf,
+    'txt': write_text,
+    'json': write_json,
+}
+
+RENDERERS = {
+    'pdf': render_pdf,
+    'txt': render_text,
+    'json': render_json,
+}
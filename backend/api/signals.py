@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api import recipe_cache, relations, search
+from api.coverage_index import record_changes
+from api.metrics import install_query_timer
+from api.replicas import reset_health_checks
+from api.versions import CATALOG, bump_version
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientsInRecipe,
+                            ListProducts, Recipe, Tag)
+from recipes.signals import image_variants_created
+from users.models import Follow, User
+from users.serializers import CustomUserSerializer
+
+AUTHOR_FIELDS = set(CustomUserSerializer.Meta.fields)
+
+
+@receiver(request_started)
+def check_database_connections(**kwargs):
+    if settings.DATABASE_HEALTH_CHECKS:
+        reset_health_checks()
+
+
+@receiver(connection_created)
+def time_database_queries(connection, **kwargs):
+    install_query_timer(connection)
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Tag)
+def bump_catalog_version(**kwargs):
+    bump_version(CATALOG)
+
+
+@receiver(image_variants_created, sender=Recipe)
+def invalidate_recipe_images(image, **kwargs):
+    recipe_cache.invalidate_recipes(
+        Recipe.objects.filter(image=image).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_recipe(instance, update_fields=None, **kwargs):
+    recipe_cache.invalidate_recipes([instance.id])
+    if update_fields == frozenset({'image_widths'}):
+        return
+    search.invalidate_search([instance.id])
+    record_changes([instance.id])
+
+
+@receiver([post_save, post_delete], sender=IngredientsInRecipe)
+def invalidate_recipe_ingredients(instance, **kwargs):
+    recipe_cache.invalidate_recipes([instance.recipe_id])
+    search.invalidate_search([instance.recipe_id])
+    record_changes([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient_search(instance, created, **kwargs):
+    if not created:
+        search.invalidate_search(IngredientsInRecipe.objects.filter(
+            ingredients=instance).values_list('recipe_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipe_cache.invalidate_recipes([instance.id])
+    elif pk_set:
+        recipe_cache.invalidate_recipes(pk_set)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(instance, created, update_fields, **kwargs):
+    if created or (update_fields is not None
+                   and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    recipe_cache.invalidate_recipes(
+        Recipe.objects.filter(author=instance).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=FavoriteRecipe)
+@receiver([post_save, post_delete], sender=ListProducts)
+@receiver([post_save, post_delete], sender=Follow)
+def invalidate_user_relations(instance, **kwargs):
+    relations.invalidate_relations(instance.user_id)
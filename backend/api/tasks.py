@@ -0,0 +1,12 @@
+from django.core.files.storage import default_storage
+
+from api import shopping_cart
+from jobs.queue import task
+from users.models import User
+
+
+@task('shopping_cart')
+def save_shopping_cart(user_id, file_type):
+    name = shopping_cart.save_shopping_list(User.objects.get(id=user_id),
+                                            file_type)
+    return {'url': default_storage.url(name)}
@@ -0,0 +1,415 @@
+import base64
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import update_last_login
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache, caches
+from django.db import connection, connections
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from api import coverage_index, versions
+from api.coverage_index import RecipeCoverageIndex
+from api.replicas import PRIMARY, REPLICA, reset_health_checks
+from api.shopping_cart import format_line, get_shopping_list
+from api.uploads import CHUNK_SIZE, decode_image
+from recipes.constants import SEARCH_CONFIG, THUMBNAIL_WIDTHS
+from recipes.fake_data import FakeDataGenerator
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientsInRecipe,
+                            ListProducts, Recipe)
+from recipes.tasks import create_image_variants
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'test-{alias}'}
+    for alias in settings.CACHES
+}
+
+
+@override_settings(CACHES=TEST_CACHES, DATABASE_ROUTERS=[],
+                   MEDIA_ROOT=MEDIA_ROOT, METRICS_SAMPLE_RATE=0)
+class RecipeTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(20))
+        FakeDataGenerator(seed=0).generate(
+            users=5, recipes=30, ingredients_per_recipe=4, favorites=20,
+            follows=5, shopping_carts=10)
+        cls.user = User.objects.order_by('id').first()
+        cls.token = Token.objects.create(user=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def get(self, path, authenticated=False):
+        headers = ({'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+                   if authenticated else {})
+        return self.client.get(path, **headers)
+
+
+class RecipeListQueriesTest(RecipeTestCase):
+    def assert_list_queries(self, queries, authenticated):
+        for limit in (2, 20):
+            with self.subTest(limit=limit):
+                self.setUp()
+                with self.assertNumQueries(queries):
+                    response = self.get(
+                        f'/api/recipes/?pagination=cursor&limit={limit}',
+                        authenticated)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous_list_queries_do_not_depend_on_page_size(self):
+        self.assert_list_queries(4, authenticated=False)
+
+    def test_authenticated_list_queries_do_not_depend_on_page_size(self):
+        self.assert_list_queries(8, authenticated=True)
+
+
+class RecipeUpdateQueriesTest(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe = Recipe.objects.filter(author=self.user).first()
+        Recipe.objects.filter(id=self.recipe.id).update(
+            image_widths=list(THUMBNAIL_WIDTHS))
+        self.ingredients = {
+            item.ingredients_id: item.amount for item in
+            IngredientsInRecipe.objects.filter(recipe=self.recipe)}
+
+    def patch(self, ingredients, queries):
+        data = {
+            'ingredients': [{'id': ingredient_id, 'amount': amount}
+                            for ingredient_id, amount in ingredients.items()],
+            'tags': list(self.recipe.tags.values_list('id', flat=True)),
+            'cooking_time': self.recipe.cooking_time,
+        }
+        with self.assertNumQueries(queries) as captured:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/', data,
+                content_type='application/json',
+                HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(IngredientsInRecipe.objects.filter(
+            recipe=self.recipe).values_list('ingredients_id', 'amount')),
+            ingredients)
+        return [query['sql'].split()[0] for query in captured
+                if IngredientsInRecipe._meta.db_table in query['sql']
+                and not query['sql'].startswith('SELECT')]
+
+    def test_unchanged_ingredients_are_not_written(self):
+        self.assertEqual(self.patch(self.ingredients, 17), [])
+
+    def test_changed_ingredients_are_diffed(self):
+        ingredients = dict(self.ingredients)
+        removed, changed, *_ = ingredients
+        del ingredients[removed]
+        ingredients[changed] += 1
+        added = Ingredient.objects.exclude(id__in=self.ingredients).first()
+        ingredients[added.id] = 5
+        self.assertEqual(self.patch(ingredients, 21),
+                         ['DELETE', 'UPDATE', 'INSERT'])
+
+
+class RecipeCacheTest(RecipeTestCase):
+    def test_login_does_not_invalidate_author_recipes(self):
+        author = User.objects.filter(recipe__isnull=False).first()
+        with self.captureOnCommitCallbacks() as callbacks:
+            update_last_login(None, author)
+        self.assertEqual(callbacks, [])
+        author.first_name = 'Другое'
+        with self.captureOnCommitCallbacks() as callbacks:
+            author.save(update_fields=['first_name'])
+        self.assertEqual(len(callbacks), 1)
+
+    def test_relation_changes_reach_other_workers(self):
+        recipe = Recipe.objects.exclude(
+            favoriterecipe__user=self.user).first()
+        path = f'/api/recipes/{recipe.id}/'
+        self.assertFalse(self.get(path, authenticated=True).data[
+            'is_favorited'])
+        with mock.patch('api.relations.get_cache'), \
+                self.captureOnCommitCallbacks(execute=True):
+            FavoriteRecipe.objects.create(user=self.user, recipe=recipe)
+        self.assertTrue(self.get(path, authenticated=True).data[
+            'is_favorited'])
+
+    def test_catalog_revalidation_does_not_query_database(self):
+        etag = self.get('/api/tags/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_cached_image_urls_follow_request_host(self):
+        recipe = Recipe.objects.order_by('id').first()
+        for host in ('first.example', 'second.example'):
+            with self.subTest(host=host):
+                response = self.client.get(f'/api/recipes/{recipe.id}/',
+                                           HTTP_HOST=host)
+                self.assertTrue(response.data['image'].startswith(
+                    f'http://{host}/'))
+
+    def test_image_variants_appear_after_generation(self):
+        recipe = Recipe.objects.order_by('id').first()
+        response = self.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.data['image_variants'],
+                         {'webp': {}, 'jpeg': {}})
+        with self.captureOnCommitCallbacks(execute=True):
+            create_image_variants(recipe.image.name)
+        variants = self.get(f'/api/recipes/{recipe.id}/').data[
+            'image_variants']
+        for extension in ('webp', 'jpeg'):
+            self.assertEqual(set(variants[extension]),
+                             {str(width) for width in THUMBNAIL_WIDTHS})
+
+
+class RecipeRelationsTest(RecipeTestCase):
+    def send(self, method, path, data=None):
+        return getattr(self.client, method)(
+            path, data, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_free_recipes(self, model):
+        return list(Recipe.objects.exclude(
+            id__in=model.objects.filter(user=self.user).values(
+                'recipe_id')).order_by('id').values_list('id', flat=True))
+
+    def test_adding_existing_relation_is_rejected(self):
+        for action, model in (('favorite', FavoriteRecipe),
+                              ('shopping_cart', ListProducts)):
+            with self.subTest(action=action):
+                path = (f'/api/recipes/{self.get_free_recipes(model)[0]}/'
+                        f'{action}/')
+                self.assertEqual(self.send('post', path).status_code, 201)
+                response = self.send('post', path)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(self.send('delete', path).status_code, 204)
+                self.assertEqual(self.send('delete', path).status_code, 404)
+
+    def test_bulk_relations_are_idempotent(self):
+        missing = Recipe.objects.order_by('-id').first().id + 1
+        for action, model in (('favorite', FavoriteRecipe),
+                              ('shopping_cart', ListProducts)):
+            with self.subTest(action=action):
+                path = f'/api/recipes/{action}/bulk/'
+                recipe_ids = self.get_free_recipes(model)[:3]
+                relations = model.objects.filter(user=self.user,
+                                                 recipe_id__in=recipe_ids)
+                for _ in range(2):
+                    response = self.send('post', path,
+                                         {'recipes': recipe_ids})
+                    self.assertEqual(response.status_code, 201)
+                    self.assertEqual(relations.count(), 3)
+                response = self.send('post', path,
+                                     {'recipes': [*recipe_ids, missing]})
+                self.assertEqual(response.status_code, 400)
+                for _ in range(2):
+                    response = self.send('delete', path,
+                                         {'recipes': [*recipe_ids, missing]})
+                    self.assertEqual(response.status_code, 204)
+                    self.assertFalse(relations.exists())
+
+
+class CoverageIndexTest(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ingredient_ids = list(Ingredient.objects.values_list(
+            'id', flat=True))
+        self.index = RecipeCoverageIndex()
+        self.index.search(self.ingredient_ids)
+
+    def search(self):
+        with mock.patch('api.coverage_index.load_ingredients',
+                        wraps=coverage_index.load_ingredients) as load:
+            found = self.index.search(self.ingredient_ids)
+        self.assertEqual(
+            found, RecipeCoverageIndex().search(self.ingredient_ids))
+        return found, [call.args for call in load.call_args_list]
+
+    def change_recipes(self):
+        first, second, third = Recipe.objects.order_by('id')[:3]
+        recipe_ids = first.id, second.id, third.id
+        used = IngredientsInRecipe.objects.filter(recipe=second).values(
+            'ingredients_id')
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientsInRecipe.objects.filter(recipe=first).first().delete()
+            IngredientsInRecipe.objects.create(
+                recipe=second, amount=1,
+                ingredients=Ingredient.objects.exclude(id__in=used).first())
+            third.delete()
+        return recipe_ids
+
+    def test_changes_are_applied_incrementally(self):
+        recipe_ids = self.change_recipes()
+        found, loads = self.search()
+        self.assertEqual(loads, [(set(recipe_ids),)])
+        self.assertNotIn(recipe_ids[2], {match['id'] for match in found})
+
+    def test_missed_change_triggers_rebuild(self):
+        self.change_recipes()
+        cache.delete(coverage_index.get_change_key(
+            coverage_index.get_sequence()))
+        self.assertEqual(self.search()[1], [()])
+
+    def test_invalidated_index_is_rebuilt(self):
+        coverage_index.invalidate_index()
+        self.assertEqual(self.search()[1], [()])
+
+
+class RecipeSearchTest(RecipeTestCase):
+    def test_search_finds_recipes_by_word(self):
+        expected = {recipe.id for recipe in Recipe.objects.all()
+                    if 'домашний' in f'{recipe.name} {recipe.text}'.lower()}
+        response = self.get('/api/recipes/search/?q=домашний')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], len(expected))
+        self.assertTrue({recipe['id'] for recipe in response.data['results']}
+                        <= expected)
+
+    def test_search_ranks_name_matches_first(self):
+        recipe = Recipe.objects.order_by('id').first()
+        recipe.name = 'Пирог с облепихой'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        for query in ('облепиха', 'облепихой'):
+            with self.subTest(query=query):
+                response = self.get(f'/api/recipes/search/?q={query}')
+                self.assertEqual(response.data['results'][0]['id'],
+                                 recipe.id)
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'Полнотекстовый поиск в базе есть только в PostgreSQL')
+    def test_search_uses_search_vector_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = Recipe.objects.filter(
+            search_vector=SearchQuery('домашний', config=SEARCH_CONFIG)
+        ).order_by().explain()
+        self.assertIn('recipe_search_vector_idx', plan)
+
+
+class ShoppingCartDownloadTest(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.filter(listproducts__isnull=False).first()
+        self.token, _ = Token.objects.get_or_create(user=user)
+        self.lines = [format_line(ingredient)
+                      for ingredient in get_shopping_list(user)]
+
+    async def download(self, file_type):
+        return await self.async_client.get(
+            f'/api/recipes/download_shopping_cart/?type={file_type}',
+            authorization=f'Token {self.token.key}')
+
+    async def test_downloads_are_served_under_asgi(self):
+        response = await self.download('txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode().splitlines(), self.lines)
+        response = await self.download('pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+
+class ImageUploadTest(SimpleTestCase):
+    def test_line_wrapped_base64_is_accepted(self):
+        buffer = BytesIO()
+        Image.frombytes('RGB', (128, 128), os.urandom(128 * 128 * 3)).save(
+            buffer, 'PNG')
+        content = buffer.getvalue()
+        encoded = base64.encodebytes(content).decode()
+        self.assertGreater(len(encoded), CHUNK_SIZE)
+        upload = decode_image(f'data:image/png;base64,{encoded}')
+        self.assertEqual(upload.read(), content)
+
+
+@skipUnless(REPLICA in settings.DATABASES,
+            'Реплика не настроена: задайте DB_REPLICA_NAME')
+@override_settings(CACHES=TEST_CACHES, METRICS_SAMPLE_RATE=0,
+                   DATABASE_REPLICA_LAG=60)
+class ReplicaRoutingTest(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.author, self.reader, self.other = (
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name=name, last_name=name, password='password')
+            for name in ('author', 'reader', 'other'))
+        for user in (self.reader, self.other):
+            Token.objects.create(user=user)
+
+    def request(self, method, path, user=None):
+        headers = ({'HTTP_AUTHORIZATION': f'Token {user.auth_token.key}'}
+                   if user else {})
+        with CaptureQueriesContext(connections[PRIMARY]) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = getattr(self.client, method)(path, **headers)
+        aliases = {alias for alias, queries in ((PRIMARY, primary),
+                                                (REPLICA, replica))
+                   if len(queries)}
+        return response, aliases
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.request('get', '/api/recipes/')[1], {REPLICA})
+        response, aliases = self.request('get', '/api/recipes/', self.reader)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(REPLICA, aliases)
+
+    def test_write_pins_only_its_client_to_primary(self):
+        response, aliases = self.request(
+            'post', f'/api/users/{self.author.id}/subscribe/', self.reader)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(aliases, {PRIMARY})
+        self.assertEqual(self.request('get', '/api/recipes/', self.reader)[1],
+                         {PRIMARY})
+        self.assertIn(REPLICA,
+                      self.request('get', '/api/recipes/', self.other)[1])
+        self.assertEqual(self.request('get', '/api/recipes/')[1], {REPLICA})
+
+    def test_catalog_reads_use_primary_while_catalog_is_recent(self):
+        cache.set(versions.get_key(versions.CATALOG), 1, timeout=None)
+        self.assertEqual(self.request('get', '/api/tags/')[1], {REPLICA})
+        versions.bump_version(versions.CATALOG)
+        self.assertEqual(self.request('get', '/api/tags/')[1], {PRIMARY})
+
+
+class DatabaseHealthCheckTest(TransactionTestCase):
+    def test_open_connection_is_checked_once_per_request(self):
+        connection.ensure_connection()
+        with mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=60), \
+                mock.patch.object(connection, 'is_usable',
+                                  return_value=False) as is_usable, \
+                mock.patch.object(connection, 'close') as close:
+            for _ in range(2):
+                reset_health_checks()
+                Ingredient.objects.exists()
+                Ingredient.objects.filter(pk=0).update(name='соль')
+        self.assertEqual(is_usable.call_count, 2)
+        self.assertEqual(close.call_count, 2)
+
+    def test_closed_connection_is_not_checked(self):
+        connection.close()
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            reset_health_checks()
+            Ingredient.objects.exists()
+        is_usable.assert_not_called()
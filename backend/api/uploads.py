@@ -0,0 +1,67 @@
+import base64
+import binascii
+import hashlib
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+from PIL import Image, UnidentifiedImageError
+from rest_framework.exceptions import ValidationError
+
+from recipes.constants import MAX_IMAGE_PIXELS, MAX_IMAGE_SIZE
+
+CHUNK_SIZE = 64 * 1024
+EXTENSION = re.compile(r'[a-z0-9]+')
+
+
+def get_decoded_size(encoded):
+    return len(encoded) * 3 // 4 - encoded[-2:].count('=')
+
+
+def create_upload(name, content_type, size):
+    if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        return TemporaryUploadedFile(name, content_type, size, None)
+    return InMemoryUploadedFile(BytesIO(), None, name, content_type, size,
+                                None)
+
+
+def check_pixels(upload):
+    try:
+        with Image.open(upload) as image:
+            width, height = image.size
+    except UnidentifiedImageError:
+        raise ValidationError('Загруженный файл не является изображением!')
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ValidationError(f'Изображение не может быть больше '
+                              f'{MAX_IMAGE_PIXELS} пикселей!')
+    upload.seek(0)
+
+
+def decode_image(data):
+    header, encoded = data.split(';base64,')
+    extension = header.split('/')[-1].lower()
+    if not EXTENSION.fullmatch(extension):
+        raise ValidationError('Недопустимый формат изображения!')
+    encoded = ''.join(encoded.split())
+    size = get_decoded_size(encoded)
+    if size > MAX_IMAGE_SIZE:
+        raise ValidationError(f'Изображение не может быть больше '
+                              f'{MAX_IMAGE_SIZE} байт!')
+
+    upload = create_upload(f'upload.{extension}', f'image/{extension}',
+                           size)
+    digest = hashlib.sha256()
+    try:
+        for start in range(0, len(encoded), CHUNK_SIZE):
+            chunk = base64.b64decode(encoded[start:start + CHUNK_SIZE],
+                                     validate=True)
+            digest.update(chunk)
+            upload.write(chunk)
+    except binascii.Error:
+        raise ValidationError('Изображение повреждено!')
+    upload.seek(0)
+    check_pixels(upload)
+    upload.name = f'{digest.hexdigest()}.{extension}'
+    return upload
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
 
 from api import views
+from api.async_views import use_async_views
 from users.views import CustomUserViewSet
 
 router = SimpleRouter()
@@ -10,9 +12,14 @@ router.register('recipes', views.RecipeViewSet)
 router.register('ingredients', views.IngredientViewSet)
 router.register('tags', views.TagViewSet)
 router.register('users', CustomUserViewSet)
+router.register('jobs', views.JobViewSet, basename='jobs')
 
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = use_async_views(router_urls)
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls.authtoken'))
 ]
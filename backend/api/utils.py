@@ -0,0 +1,30 @@
+import asyncio
+
+from django.db import IntegrityError, transaction
+from django.http import Http404
+from rest_framework.exceptions import ValidationError
+
+
+def create_unique(model, error_message, **fields):
+    try:
+        with transaction.atomic():
+            return model.objects.create(**fields)
+    except IntegrityError:
+        raise ValidationError(error_message)
+
+
+def delete_existing(queryset):
+    deleted, _ = queryset.delete()
+    if not deleted:
+        raise Http404
+
+
+class AsyncCapableMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
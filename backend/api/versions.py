@@ -0,0 +1,46 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+CATALOG = 'catalog'
+
+
+def get_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    version = cache.get(get_key(name))
+    if version is None:
+        version = time.time_ns() // 1000
+        if not cache.add(get_key(name), version, timeout=None):
+            version = cache.get(get_key(name), version)
+    return version
+
+
+def get_versions(names):
+    keys = {name: get_key(name) for name in names}
+    found = cache.get_many(keys.values())
+    return {name: (found[key] if key in found else get_version(name))
+            for name, key in keys.items()}
+
+
+def bump_version(name):
+    version = time.time_ns() // 1000
+    cache.set(get_key(name), version, timeout=None)
+    return version
+
+
+def bump_versions(names):
+    version = time.time_ns() // 1000
+    cache.set_many({get_key(name): version for name in names}, timeout=None)
+
+
+def is_recent(version, seconds):
+    return version > time.time_ns() // 1000 - seconds * 10 ** 6
+
+
+def get_modified(name):
+    return datetime.fromtimestamp(get_version(name) / 10 ** 6,
+                                  tz=timezone.utc)
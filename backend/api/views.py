@@ -1,21 +1,48 @@
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from reportlab.pdfgen import canvas
+from rest_framework.views import APIView
 
-from api import permissions, serializers
+from api import (permissions, recipe_cache, relations, serializers,
+                 search, shopping_cart, versions)
+from api.coverage_index import coverage_index
 from api.filters import RecipeFilter
+from api.ingredient_index import ingredient_index
+from api.metrics import render_metrics
+from api.pagination import RecipePagination
+from api.utils import create_unique, delete_existing
+from jobs.models import Job
+from jobs.queue import enqueue
+from recipes.constants import LENGTH
 from recipes.models import (Recipe, Tag, Ingredient, FavoriteRecipe,
                             ListProducts)
 
 
+def catalog_etag(request, *args, **kwargs):
+    return str(versions.get_version(versions.CATALOG))
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return versions.get_modified(versions.CATALOG)
+
+
+catalog_cache = method_decorator(
+    [condition(etag_func=catalog_etag,
+               last_modified_func=catalog_last_modified),
+     cache_control(public=True, no_cache=True)],
+    name='dispatch')
+
+
+@catalog_cache
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
@@ -24,14 +51,19 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        ingredient_name = self.request.query_params.get('name', None)
-        if ingredient_name:
-            queryset = queryset.filter(name__startswith=ingredient_name)
-        return queryset
+    def list(self, request, *args, **kwargs):
+        ingredient_name = request.query_params.get('name')
+        if not ingredient_name:
+            return super().list(request, *args, **kwargs)
+        limit = request.query_params.get('limit')
+        if limit is not None and (not limit.isdigit() or int(limit) < 1):
+            raise ValidationError('Параметр limit должен быть '
+                                  'положительным числом!')
+        return Response(ingredient_index.search(ingredient_name,
+                                                limit and int(limit)))
 
 
+@catalog_cache
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
@@ -40,55 +72,120 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
-    pagination_class = PageNumberPagination
+    pagination_class = RecipePagination
     permission_classes = (permissions.IsAuthenticatedAuthorOrReadOnly,)
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
     http_method_names = ['get', 'post', 'delete', 'patch']
 
-    def get(self, request):
-        queryset = Recipe.objects.all()
-        page = self.paginate_queryset(queryset)
-
-        if page is not None:
-            serializer = serializers.RecipeSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = serializers.RecipeSerializer(queryset, many=True)
-        return Response(serializer.data)
+    def get_queryset(self):
+        if self.action == 'retrieve':
+            return Recipe.objects.with_related()
+        return super().get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values('id', 'pub_date'))
+        return self.get_paginated_response(recipe_cache.get_recipes(
+            [recipe['id'] for recipe in page], request))
+
+    @action(detail=False, methods=('GET',))
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError('Укажите поисковый запрос в параметре q')
+        if len(query) > LENGTH:
+            raise ValidationError(f'Поисковый запрос длиннее {LENGTH} '
+                                  f'символов')
+        paginator = PageNumberPagination()
+        recipe_ids = paginator.paginate_queryset(search.search_recipes(
+            self.filter_queryset(self.get_queryset()), query), request, self)
+        return paginator.get_paginated_response(
+            recipe_cache.get_recipes(list(recipe_ids), request))
+
+    @action(detail=False, methods=('GET',))
+    def cook(self, request):
+        serializer = serializers.AvailableIngredientsSerializer(
+            data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        found = coverage_index.search(
+            serializer.validated_data['ingredients'],
+            serializer.validated_data.get('max_missing'))
+        if set(request.query_params) & set(RecipeFilter.base_filters):
+            allowed = set(self.filter_queryset(
+                self.get_queryset()).values_list('id', flat=True))
+            found = [match for match in found if match['id'] in allowed]
+        paginator = PageNumberPagination()
+        page = paginator.paginate_queryset(found, request, self)
+        recipes = recipe_cache.get_recipes(
+            [match['id'] for match in page], request)
+        matches = {match['id']: match for match in page}
+        return paginator.get_paginated_response(
+            [dict(recipe, **matches[recipe['id']]) for recipe in recipes])
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe_id = kwargs[self.lookup_field]
+        recipes = (recipe_cache.get_recipes([int(recipe_id)], request)
+                   if recipe_id.isdigit() else None)
+        if not recipes:
+            raise Http404
+        return Response(recipes[0])
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'search', 'cook'):
             return serializers.RecipeSerializer
         return serializers.NewRecipeSerializer
 
+    def add_relation(self, request, pk, model, serializer_class,
+                     error_message):
+        relation = create_unique(model, error_message, user=request.user,
+                                 recipe=get_object_or_404(Recipe, id=pk))
+        serializer = serializer_class(relation, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def update_relations(self, request, model):
+        serializer = serializers.RecipeIdsSerializer(
+            data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'DELETE':
+            model.objects.filter(user=request.user,
+                                 recipe_id__in=recipe_ids).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        model.objects.bulk_create(
+            (model(user=request.user, recipe_id=recipe_id)
+             for recipe_id in recipe_ids),
+            ignore_conflicts=True)
+        relations.invalidate_relations(request.user.id)
+        serializer = serializers.RecipeFollowSerializer(
+            Recipe.objects.filter(id__in=recipe_ids), many=True,
+            context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(detail=True,
             methods=('POST',),
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk):
-        return self.add_favorite(request, pk)
+        return self.add_relation(request, pk, FavoriteRecipe,
+                                 serializers.FavoriteRecipeSerializer,
+                                 'Рецепт уже есть в избранном')
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        get_object_or_404(FavoriteRecipe, user=request.user,
-                          recipe=recipe).delete()
+        delete_existing(FavoriteRecipe.objects.filter(user=request.user,
+                                                      recipe_id=pk))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def add_favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        recipe_instance = FavoriteRecipe(user=request.user, recipe=recipe)
-        serializer = serializers.FavoriteRecipeSerializer(
-            instance=recipe_instance,
-            data=request.data,
-            context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    @action(detail=False,
+            methods=('POST', 'DELETE'),
+            url_path='favorite/bulk',
+            permission_classes=(IsAuthenticated,))
+    def bulk_favorite(self, request):
+        return self.update_relations(request, FavoriteRecipe)
 
     @action(
         detail=True,
@@ -96,63 +193,55 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def shopping_cart(self, request, pk):
-        return self.add_shopping_cart(request, pk)
-
-    def add_shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        recipe_instance = ListProducts(user=request.user, recipe=recipe)
-        serializer = serializers.ListProductsSerializer(
-            instance=recipe_instance,
-            data=request.data,
-            context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return self.add_relation(request, pk, ListProducts,
+                                 serializers.ListProductsSerializer,
+                                 'Рецепт уже есть в корзине')
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        get_object_or_404(ListProducts, user=request.user,
-                          recipe=recipe).delete()
+        delete_existing(ListProducts.objects.filter(user=request.user,
+                                                    recipe_id=pk))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False,
+            methods=('POST', 'DELETE'),
+            url_path='shopping_cart/bulk',
+            permission_classes=(IsAuthenticated,))
+    def bulk_shopping_cart(self, request):
+        return self.update_relations(request, ListProducts)
+
     @action(
         detail=False,
         methods=('GET',),
         permission_classes=(IsAuthenticated,),
     )
     def download_shopping_cart(self, request):
-        pdfmetrics.registerFont(TTFont('Arial', '/app/recipes/management/'
-                                                'ArialRegular.ttf'))
-
-        ingredients = Recipe.objects.filter(
-            listproducts__user=request.user
-        ).values(
-            'ingredients__name',
-            'ingredients__measurement_unit',
-            'ingredientsinrecipe__amount'
-        ).order_by("ingredients__name")
-
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = ('attachment; filename="'
-                                           'shopping_cart.pdf"')
-
-        pdf = canvas.Canvas(response)
+        file_type = request.query_params.get('type', 'pdf')
+        if file_type not in shopping_cart.RENDERERS:
+            raise ValidationError(
+                f'Формат должен быть одним из: '
+                f'{", ".join(shopping_cart.RENDERERS)}')
+        if request.query_params.get('background') in ('1', 'true'):
+            job = enqueue('shopping_cart', user=request.user,
+                          user_id=request.user.id, file_type=file_type)
+            return Response(serializers.JobSerializer(job).data,
+                            status=status.HTTP_202_ACCEPTED)
+        return shopping_cart.RENDERERS[file_type](
+            shopping_cart.get_shopping_list(request.user),
+            streaming=shopping_cart.can_stream(request._request))
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = serializers.JobSerializer
+    permission_classes = (IsAuthenticated,)
 
-        pdf.setFont("Arial", 12)
-
-        y_position = 780
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
 
-        for ing in ingredients:
-            ingredient_text = (
-                f'- {ing["ingredients__name"]}, '
-                f'{ing["ingredientsinrecipe__amount"]}'
-                f'{ing["ingredients__measurement_unit"]} '
-            )
-            pdf.drawString(100, y_position, ingredient_text)
-            y_position -= 20
 
-        pdf.showPage()
-        pdf.save()
+class MetricsView(APIView):
+    permission_classes = (IsAdminUser,)
 
-        return response
+    def get(self, request):
+        return HttpResponse(render_metrics(),
+                            content_type='text/plain; version=0.0.4')
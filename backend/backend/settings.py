@@ -15,12 +15,14 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'djoser',
     'django_filters',
@@ -29,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,10 +69,39 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+DATABASE_HEALTH_CHECKS = os.getenv('DB_HEALTH_CHECKS', 'True') == 'True'
+DATABASE_REPLICA_LAG = int(os.getenv('DB_REPLICA_LAG', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.'
+                                              'memcached.PyMemcacheCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+    'recipes': {
+        'BACKEND': os.getenv('RECIPE_CACHE_BACKEND', 'django.core.cache.'
+                                                     'backends.locmem.'
+                                                     'LocMemCache'),
+        'LOCATION': os.getenv('RECIPE_CACHE_LOCATION', 'recipes'),
+        'TIMEOUT': int(os.getenv('RECIPE_CACHE_TIMEOUT', 60 * 60 * 24)),
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.'
@@ -104,6 +137,16 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False') == 'True'
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 1))
+JOBS_TIMEOUT = int(os.getenv('JOBS_TIMEOUT', 10 * 60))
+
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.1))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 10))
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'True') == 'True'
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
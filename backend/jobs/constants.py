@@ -0,0 +1,5 @@
+LENGTH = 200
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 10
+TIMEOUT_ERROR = 'Задача не завершилась за отведённое время'
+STATUS_LENGTH = 10
@@ -0,0 +1,17 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Ставит фоновую задачу в очередь'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name')
+        parser.add_argument('--payload', type=json.loads, default={})
+
+    def handle(self, *args, name, payload, **options):
+        job = enqueue(name, **payload)
+        self.stdout.write(f'{job.id} {job.name}: {job.status}')
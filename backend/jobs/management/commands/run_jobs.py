@@ -0,0 +1,49 @@
+import signal
+from threading import Event, Thread
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from jobs.queue import run_next
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.JOBS_POLL_INTERVAL)
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти')
+
+    def handle(self, *args, workers, poll_interval, once, **options):
+        stop = Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        threads = [Thread(target=self.work, args=(stop, poll_interval, once))
+                   for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(poll_interval)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self, stop, poll_interval, once):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                job = run_next()
+                if job is not None:
+                    self.stdout.write(f'{job.id} {job.name}: {job.status}')
+                elif once:
+                    return
+                else:
+                    stop.wait(poll_interval)
+        finally:
+            connection.close()
@@ -0,0 +1,51 @@
+from django.db import models
+from django.utils import timezone
+
+from users.models import User
+
+from .constants import LENGTH, MAX_ATTEMPTS, STATUS_LENGTH
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(max_length=LENGTH, verbose_name='Задача')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True,
+                             blank=True, verbose_name='Юзер')
+    payload = models.JSONField(default=dict, blank=True,
+                               verbose_name='Параметры')
+    status = models.CharField(max_length=STATUS_LENGTH, choices=STATUSES,
+                              default=PENDING,
+                              verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попытки')
+    max_attempts = models.PositiveSmallIntegerField(
+        default=MAX_ATTEMPTS, verbose_name='Максимум попыток')
+    result = models.JSONField(null=True, blank=True,
+                              verbose_name='Результат')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    run_after = models.DateTimeField(default=timezone.now,
+                                     verbose_name='Запустить после')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Создана')
+    updated = models.DateTimeField(auto_now=True, verbose_name='Обновлена')
+
+    class Meta:
+        verbose_name = 'Фоновые задачи'
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['status', 'run_after'],
+                         name='job_status_run_after_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.name}, {self.status}'
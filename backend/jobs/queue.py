@@ -0,0 +1,96 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .constants import RETRY_DELAY, TIMEOUT_ERROR
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, user=None, **payload):
+    if name not in TASKS:
+        raise KeyError(f'Unknown task: {name}')
+    job = Job.objects.create(name=name, user=user, payload=payload)
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: run_job(start_job(job)))
+    return job
+
+
+def is_queued(name, **payload):
+    return Job.objects.filter(
+        name=name, status__in=(Job.PENDING, Job.RUNNING),
+        **{f'payload__{key}': value for key, value in payload.items()}
+    ).exists()
+
+
+def start_job(job):
+    job.status = Job.RUNNING
+    job.attempts += 1
+    job.save(update_fields=['status', 'attempts', 'updated'])
+    return job
+
+
+def fail_job(job, error):
+    job.status = Job.FAILED
+    job.error = error
+    job.save(update_fields=['status', 'error', 'updated'])
+    return job
+
+
+def claim_job():
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = Job.objects.select_for_update(skip_locked=True).filter(
+                Q(status=Job.PENDING, run_after__lte=now)
+                | Q(status=Job.RUNNING, updated__lt=now - timedelta(
+                    seconds=settings.JOBS_TIMEOUT))
+            ).order_by('run_after', 'id').first()
+            if job is None:
+                return None
+            if job.status == Job.RUNNING and job.attempts >= job.max_attempts:
+                logger.error('Job %s (%s) timed out', job.id, job.name)
+                fail_job(job, TIMEOUT_ERROR)
+                continue
+            return start_job(job)
+
+
+def run_job(job):
+    try:
+        job.result = TASKS[job.name](**job.payload)
+        job.status = Job.DONE
+        job.error = ''
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.id, job.name)
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=RETRY_DELAY * 2 ** job.attempts)
+        else:
+            job.status = Job.FAILED
+    job.save(update_fields=['result', 'status', 'error', 'run_after',
+                            'updated'])
+    return job
+
+
+def run_next():
+    job = claim_job()
+    if job is not None:
+        run_job(job)
+    return job
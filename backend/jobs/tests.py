@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .constants import MAX_ATTEMPTS, TIMEOUT_ERROR
+from .models import Job
+from .queue import claim_job
+
+
+@override_settings(JOBS_TIMEOUT=60)
+class ClaimJobTest(TestCase):
+    def create_stale_job(self, attempts):
+        job = Job.objects.create(name='image_variants', status=Job.RUNNING,
+                                 attempts=attempts)
+        Job.objects.filter(id=job.id).update(
+            updated=timezone.now() - timedelta(minutes=5))
+        return job
+
+    def test_stale_job_is_retried_while_attempts_remain(self):
+        job = self.create_stale_job(attempts=1)
+        self.assertEqual(claim_job(), job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.RUNNING, 2))
+
+    def test_stale_job_without_attempts_left_fails(self):
+        job = self.create_stale_job(attempts=MAX_ATTEMPTS)
+        self.assertIsNone(claim_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.FAILED, TIMEOUT_ERROR))
@@ -4,3 +4,12 @@ MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 100
 DEFAULT_AMOUNT = 1
 MIN_AMMOUNT_INGREDIENTS = 1
+MAX_BULK_RECIPES = 500
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 4096 * 4096
+THUMBNAIL_WIDTHS = (320, 640)
+THUMBNAIL_QUALITY = 80
+SEARCH_CONFIG = 'russian'
+SEARCH_SIMILARITY = 0.3
+MAX_INDEX_CHANGES = 1000
+MAX_AVAILABLE_INGREDIENTS = 100
@@ -0,0 +1,252 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from users.models import Follow, User
+
+from .models import (FavoriteRecipe, Ingredient, IngredientsInRecipe,
+                     ListProducts, Recipe, Tag)
+from .utils import get_batches
+
+BATCH_SIZE = 5000
+CATALOG_PATH = settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
+PASSWORD = 'foodgram-fake'
+POPULARITY_EXPONENT = 1.1
+MAX_PICK_ATTEMPTS = 10
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#D2A475', 'dessert'),
+    ('Выпечка', '#C75B5B', 'baking'),
+    ('Суп', '#5BA3C7', 'soup'),
+    ('Салат', '#7BC75B', 'salad'),
+    ('Напиток', '#B05BC7', 'drink'),
+)
+WORDS = ('быстрый', 'домашний', 'сытный', 'лёгкий', 'острый', 'пряный',
+         'сладкий', 'летний', 'зимний', 'праздничный', 'бабушкин',
+         'деревенский', 'овощной', 'мясной', 'рыбный', 'постный')
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n',
+                              '\r': '\\r'})
+
+
+@contextmanager
+def explicit_pub_date():
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def format_copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).translate(COPY_ESCAPES)
+
+
+class Popularity:
+    def __init__(self, rng, items, exponent=POPULARITY_EXPONENT):
+        self.random = rng
+        self.items = rng.sample(items, len(items))
+        self.weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(items) + 1)))
+
+    def choices(self, amount):
+        if not self.items:
+            return []
+        return self.random.choices(self.items, cum_weights=self.weights,
+                                   k=amount)
+
+    def pick(self, amount, exclude=None):
+        amount = min(amount, len(self.items) - (exclude is not None))
+        if amount <= 0:
+            return []
+        picked = set()
+        for _ in range(MAX_PICK_ATTEMPTS):
+            if len(picked) >= amount:
+                break
+            picked.update(item for item in self.choices(amount - len(picked))
+                          if item != exclude)
+        return sorted(picked)
+
+
+class FakeDataGenerator:
+    def __init__(self, seed=0, batch_size=BATCH_SIZE, log=None):
+        self.random = random.Random(seed)
+        self.prefix = f'fake{seed}'
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+
+    def copy(self, model, rows):
+        fields = [field for field in model._meta.concrete_fields
+                  if not field.primary_key]
+        defaults = {field.attname: field.get_default() for field in fields}
+        columns = ', '.join(connection.ops.quote_name(field.column)
+                            for field in fields)
+        table = connection.ops.quote_name(model._meta.db_table)
+        staging = connection.ops.quote_name(
+            f'{model._meta.db_table}_staging')
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TEMPORARY TABLE {staging} AS SELECT '
+                           f'{columns} FROM {table} WITH NO DATA')
+            for batch in get_batches(rows, self.batch_size):
+                buffer = StringIO()
+                for row in batch:
+                    buffer.write('\t'.join(
+                        format_copy_value(row.get(attname, default))
+                        for attname, default in defaults.items()) + '\n')
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {staging} ({columns}) FROM STDIN', buffer)
+            cursor.execute(f'INSERT INTO {table} ({columns}) SELECT '
+                           f'{columns} FROM {staging} ON CONFLICT DO NOTHING')
+            created = cursor.rowcount
+            cursor.execute(f'DROP TABLE {staging}')
+        return created
+
+    def insert(self, model, rows):
+        if connection.vendor == 'postgresql':
+            created = self.copy(model, rows)
+        else:
+            existing = model.objects.count()
+            for batch in get_batches(rows, self.batch_size):
+                model.objects.bulk_create([model(**row) for row in batch],
+                                          ignore_conflicts=True)
+            created = model.objects.count() - existing
+        self.log(f'{model._meta.verbose_name}: {created}')
+        return created
+
+    def get_last_id(self, model):
+        return model.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+
+    def get_users(self):
+        return User.objects.filter(username__startswith=f'{self.prefix}_')
+
+    def get_recipes(self):
+        return Recipe.objects.filter(author__in=self.get_users())
+
+    def get_ids(self, queryset):
+        return list(queryset.order_by('id').values_list('id', flat=True))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        now = timezone.now()
+        self.insert(User, (
+            dict(email=f'{self.prefix}_{number}@example.com',
+                 username=f'{self.prefix}_{number}',
+                 first_name=f'Имя{number}', last_name=f'Фамилия{number}',
+                 password=password, date_joined=now)
+            for number in range(count)))
+        return self.get_ids(self.get_users())
+
+    def create_tags(self):
+        Tag.objects.bulk_create(
+            [Tag(name=name, color=color, slug=slug)
+             for name, color, slug in TAGS], ignore_conflicts=True)
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_image(self):
+        buffer = BytesIO()
+        Image.new('RGB', (64, 64), (226, 108, 45)).save(buffer, 'PNG')
+        content = buffer.getvalue()
+        storage = Recipe.image.field.storage
+        return storage.save(
+            f'recipes/{hashlib.sha256(content).hexdigest()}.png',
+            ContentFile(content))
+
+    def create_recipes(self, count, authors, ingredient_ids,
+                       ingredients_per_recipe, tag_ids, tags_per_recipe=2):
+        count -= self.get_recipes().count()
+        if count <= 0:
+            return self.get_ids(self.get_recipes())
+        if not authors.items:
+            raise ValueError('Для рецептов нужен хотя бы один пользователь')
+        last_id = self.get_last_id(Recipe)
+        image = self.create_image()
+        start = timezone.now() - timedelta(minutes=count)
+        with explicit_pub_date():
+            self.insert(Recipe, (
+                dict(author_id=author_id,
+                     name=f'{self.random.choice(WORDS).capitalize()} '
+                          f'рецепт {number}',
+                     text=' '.join(self.random.sample(WORDS, 5)),
+                     cooking_time=self.random.randint(1, 100),
+                     image=image,
+                     pub_date=start + timedelta(minutes=number))
+                for number, author_id in enumerate(authors.choices(count))))
+        recipe_ids = self.get_ids(Recipe.objects.filter(id__gt=last_id))
+        self.insert(IngredientsInRecipe, (
+            dict(recipe_id=recipe_id, ingredients_id=ingredient_id,
+                 amount=self.random.randint(1, 500))
+            for recipe_id in recipe_ids
+            for ingredient_id in self.random.sample(
+                ingredient_ids,
+                min(ingredients_per_recipe, len(ingredient_ids)))))
+        self.insert(Recipe.tags.through, (
+            dict(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.random.sample(
+                tag_ids, min(tags_per_recipe, len(tag_ids)))))
+        if connection.vendor == 'postgresql':
+            Recipe.objects.filter(id__gt=last_id).update_search_vectors()
+        return self.get_ids(self.get_recipes())
+
+    def distribute(self, total, owners):
+        if not owners or total <= 0:
+            return {}
+        share, extra = divmod(total, len(owners))
+        return {owner: share + (number < extra)
+                for number, owner in enumerate(owners)}
+
+    def get_missing(self, model, count):
+        return count - model.objects.filter(user__in=self.get_users()).count()
+
+    def create_relations(self, model, count, user_ids, recipes):
+        count = self.get_missing(model, count)
+        return self.insert(model, (
+            dict(user_id=user_id, recipe_id=recipe_id)
+            for user_id, amount in self.distribute(count, user_ids).items()
+            for recipe_id in recipes.pick(amount)))
+
+    def create_follows(self, count, user_ids, authors):
+        count = self.get_missing(Follow, count)
+        return self.insert(Follow, (
+            dict(user_id=user_id, author_id=author_id)
+            for user_id, amount in self.distribute(count, user_ids).items()
+            for author_id in authors.pick(amount, exclude=user_id)))
+
+    def generate(self, users, recipes, ingredients_per_recipe, favorites,
+                 follows, shopping_carts=0):
+        ingredient_ids = list(Ingredient.objects.order_by('id').values_list(
+            'id', flat=True))
+        with transaction.atomic():
+            user_ids = self.create_users(users)
+            authors = Popularity(self.random, user_ids)
+            tag_ids = self.create_tags()
+            recipe_ids = self.create_recipes(
+                recipes, authors, ingredient_ids, ingredients_per_recipe,
+                tag_ids)
+            popular_recipes = Popularity(self.random, recipe_ids)
+            self.create_relations(FavoriteRecipe, favorites, user_ids,
+                                  popular_recipes)
+            self.create_relations(ListProducts, shopping_carts, user_ids,
+                                  popular_recipes)
+            self.create_follows(follows, user_ids, authors)
+        return user_ids, recipe_ids
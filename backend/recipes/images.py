@@ -0,0 +1,58 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from .constants import THUMBNAIL_QUALITY, THUMBNAIL_WIDTHS
+
+THUMBNAIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+THUMBNAIL_DIR = 'recipes/thumbnails'
+
+
+def get_variant_name(name, width, extension):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{THUMBNAIL_DIR}/{stem}_{width}.{extension}'
+
+
+def get_variant_names(name, widths=THUMBNAIL_WIDTHS):
+    return {extension: {width: get_variant_name(name, width, extension)
+                        for width in widths}
+            for extension in THUMBNAIL_FORMATS}
+
+
+def resize(image, width):
+    if image.width <= width:
+        return image
+    return image.resize((width, round(image.height * width / image.width)),
+                        Image.LANCZOS)
+
+
+def get_missing_variants(storage, name):
+    return [(extension, width, variant_name)
+            for extension, names in get_variant_names(name).items()
+            for width, variant_name in names.items()
+            if not storage.exists(variant_name)]
+
+
+def get_complete_widths(missing):
+    missing_widths = {width for _, width, _ in missing}
+    return [width for width in THUMBNAIL_WIDTHS
+            if width not in missing_widths]
+
+
+def get_available_widths(storage, name):
+    return get_complete_widths(get_missing_variants(storage, name))
+
+
+def generate_variants(storage, name):
+    variants = get_missing_variants(storage, name)
+    if not variants:
+        return
+    with storage.open(name) as file, Image.open(file) as image:
+        image = image.convert('RGB')
+        for extension, width, variant_name in variants:
+            output = BytesIO()
+            resize(image, width).save(output, THUMBNAIL_FORMATS[extension],
+                                      quality=THUMBNAIL_QUALITY)
+            storage.save(variant_name, ContentFile(output.getvalue()))
@@ -0,0 +1,171 @@
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from api.versions import CATALOG, bump_version
+from recipes.models import Ingredient, Tag
+from recipes.utils import get_batches
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+MODELS = {
+    'ingredients': (Ingredient, ('name', 'measurement_unit'),
+                    ('name', 'measurement_unit')),
+    'tags': (Tag, ('name', 'color', 'slug'), ('slug',)),
+}
+
+
+def read_csv(file, fields):
+    reader = csv.reader(file)
+    for number, row in enumerate(reader):
+        if number == 0 and [value.strip().lower()
+                            for value in row] == list(fields):
+            continue
+        yield dict(zip(fields, row)) if len(row) == len(fields) else None
+
+
+def read_json(file, fields):
+    decoder = json.JSONDecoder()
+    buffer = file.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('JSON должен содержать список объектов')
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            if eof:
+                raise CommandError('Некорректный JSON')
+            chunk = file.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item if isinstance(item, dict) else None
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
+
+
+def clean_row(row, fields):
+    if row is None:
+        return None
+    values = {field: str(row.get(field) or '').strip() for field in fields}
+    return values if all(values.values()) else None
+
+
+def get_unique_fields(model, key_fields):
+    return [field.name for field in model._meta.concrete_fields
+            if field.unique and not field.primary_key
+            and field.name not in key_fields]
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты или теги из CSV или JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--model', choices=MODELS, default='ingredients')
+        parser.add_argument('--format', choices=('csv', 'json'))
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def import_batch(self, model, fields, key_fields, rows):
+        counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        batch = {}
+        for row in rows:
+            key = None if row is None else tuple(
+                row[field] for field in key_fields)
+            if key is None or key in batch:
+                counts['skipped'] += 1
+            else:
+                batch[key] = row
+        lookup = {f'{key_fields[0]}__in': {key[0] for key in batch}}
+        existing = {
+            tuple(getattr(obj, field) for field in key_fields): obj
+            for obj in model.objects.filter(**lookup)}
+        update_fields = [field for field in fields
+                         if field not in key_fields]
+        changed = []
+        for key, row in batch.items():
+            obj = existing.get(key)
+            if obj is None:
+                changed.append((key, model(**row), True))
+            elif any(getattr(obj, field) != row[field]
+                     for field in update_fields):
+                for field in update_fields:
+                    setattr(obj, field, row[field])
+                changed.append((key, obj, False))
+            else:
+                counts['skipped'] += 1
+        unique_fields = get_unique_fields(model, key_fields)
+        owners = self.get_owners(model, key_fields, unique_fields,
+                                 [obj for _, obj, _ in changed])
+        created, updated = [], []
+        for key, obj, is_new in changed:
+            values = [(field, getattr(obj, field)) for field in unique_fields]
+            if any(owners.get(value, key) != key for value in values):
+                counts['skipped'] += 1
+                continue
+            owners.update(dict.fromkeys(values, key))
+            (created if is_new else updated).append(obj)
+        try:
+            with transaction.atomic():
+                created = model.objects.bulk_create(created)
+                if updated:
+                    model.objects.bulk_update(updated, update_fields)
+        except IntegrityError as error:
+            raise CommandError(f'Не удалось сохранить пачку: {error}')
+        counts['inserted'] += len(created)
+        counts['updated'] += len(updated)
+        return counts
+
+    def get_owners(self, model, key_fields, unique_fields, objs):
+        if not unique_fields or not objs:
+            return {}
+        lookup = Q()
+        for field in unique_fields:
+            lookup |= Q(**{f'{field}__in': {getattr(obj, field)
+                                            for obj in objs}})
+        owners = {}
+        for obj in model.objects.filter(lookup):
+            key = tuple(getattr(obj, field) for field in key_fields)
+            for field in unique_fields:
+                owners[field, getattr(obj, field)] = key
+        return owners
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        extension = (f'.{options["format"]}' if options['format']
+                     else path.suffix.lower())
+        if extension not in READERS:
+            raise CommandError('Поддерживаются только CSV и JSON')
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше нуля')
+        model, fields, key_fields = MODELS[options['model']]
+        totals = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as file:
+                rows = (clean_row(row, fields)
+                        for row in READERS[extension](file, fields))
+                for batch in get_batches(rows, options['batch_size']):
+                    for name, count in self.import_batch(
+                            model, fields, key_fields, batch).items():
+                        totals[name] += count
+        except OSError as error:
+            raise CommandError(error)
+        finally:
+            if totals['inserted'] or totals['updated']:
+                bump_version(CATALOG)
+        self.stdout.write(
+            f'{model._meta.verbose_name}: добавлено {totals["inserted"]}, '
+            f'обновлено {totals["updated"]}, '
+            f'пропущено {totals["skipped"]}')
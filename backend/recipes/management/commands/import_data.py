@@ -1,21 +1,21 @@
-import csv
+from pathlib import Path
 
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
-from recipes.models import Ingredient
+DEFAULT_PATH = Path(__file__).resolve().parent / 'ingredients.csv'
 
 
 class Command(BaseCommand):
+    help = 'Загружает ингредиенты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument('--batch-size', type=int)
+
     def handle(self, *args, **options):
-        csv_file = open('/app/recipes/management/commands/ingredients.csv',
-                        encoding='utf-8')
-        reader = csv.reader(csv_file, delimiter=',')
-        next(reader, None)
-        list_ingredients = []
-        for row in reader:
-            name, meashurement_unit = row
-            list_ingredients.append(Ingredient(
-                name=name,
-                measurement_unit=meashurement_unit))
-        Ingredient.objects.bulk_create(list_ingredients)
-        print('Ингредиенты +')
+        extra = {}
+        if options['batch_size']:
+            extra['batch_size'] = options['batch_size']
+        call_command('import_catalog', str(options['path']),
+                     model='ingredients', stdout=self.stdout, **extra)
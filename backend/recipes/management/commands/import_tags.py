@@ -1,22 +1,21 @@
-import csv
+from pathlib import Path
 
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
-from recipes.models import Tag
+DEFAULT_PATH = Path(__file__).resolve().parent / 'tag.csv'
 
 
 class Command(BaseCommand):
+    help = 'Загружает теги'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument('--batch-size', type=int)
+
     def handle(self, *args, **options):
-        csv_file2 = open('/app/recipes/management/commands/tag.csv',
-                         encoding='utf-8')
-        reader = csv.reader(csv_file2, delimiter=',')
-        next(reader, None)
-        list_tags = []
-        for row in reader:
-            name, color, slug = row
-            list_tags.append(Tag(
-                name=name,
-                color=color,
-                slug=slug))
-        Tag.objects.bulk_create(list_tags)
-        print('Теги +')
+        extra = {}
+        if options['batch_size']:
+            extra['batch_size'] = options['batch_size']
+        call_command('import_catalog', str(options['path']),
+                     model='tags', stdout=self.stdout, **extra)
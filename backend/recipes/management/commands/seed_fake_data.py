@@ -0,0 +1,50 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from api.coverage_index import invalidate_index
+from api.search import SEARCH
+from api.versions import bump_version
+from recipes.fake_data import BATCH_SIZE, CATALOG_PATH, FakeDataGenerator
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = ('Генерирует синтетических пользователей, рецепты, избранное, '
+            'списки покупок и подписки для нагрузочного тестирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=1000000)
+        parser.add_argument('--shopping-carts', type=int, default=1000000)
+        parser.add_argument('--follows', type=int, default=200000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--catalog', default=str(CATALOG_PATH))
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше нуля')
+        started = time.monotonic()
+        if not Ingredient.objects.exists():
+            call_command('import_catalog', options['catalog'],
+                         stdout=self.stdout)
+
+        def log(message):
+            self.stdout.write(f'[{time.monotonic() - started:7.1f}s] '
+                              f'{message}')
+
+        try:
+            FakeDataGenerator(options['seed'], options['batch_size'],
+                              log).generate(
+                options['users'], options['recipes'],
+                options['ingredients_per_recipe'], options['favorites'],
+                options['follows'], options['shopping_carts'])
+        except ValueError as error:
+            raise CommandError(error)
+        bump_version(SEARCH)
+        invalidate_index()
+        log('Готово')
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import Min
+
+UNIQUE_FIELDS = {
+    'FavoriteRecipe': ('user', 'recipe'),
+    'ListProducts': ('user', 'recipe'),
+    'IngredientsInRecipe': ('recipe', 'ingredients'),
+}
+
+
+def remove_duplicates(apps, schema_editor):
+    for model_name, fields in UNIQUE_FIELDS.items():
+        model = apps.get_model('recipes', model_name)
+        first_ids = model.objects.values(*fields).annotate(
+            first_id=Min('id')).values('first_id')
+        model.objects.exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_remove_duplicate_relations'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='favoriterecipe',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite_user_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientsinrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredients'), name='unique_recipe_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='listproducts',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_cart_user_recipe'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+SEARCH_CONFIG = 'russian'
+
+INDEXES = {
+    'Recipe': [
+        GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        GinIndex(fields=['name'], opclasses=['gin_trgm_ops'],
+                 name='recipe_name_trgm_idx'),
+    ],
+}
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, indexes in INDEXES.items():
+        for index in indexes:
+            schema_editor.add_index(apps.get_model('recipes', model_name),
+                                    index)
+    ingredient_names = apps.get_model(
+        'recipes', 'IngredientsInRecipe').objects.filter(
+            recipe=OuterRef('pk')).order_by().values('recipe').annotate(
+                names=StringAgg('ingredients__name', ' ')).values('names')
+    apps.get_model('recipes', 'Recipe').objects.update(search_vector=(
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(ingredient_names), weight='C',
+                       config=SEARCH_CONFIG)))
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, indexes in INDEXES.items():
+        for index in indexes:
+            schema_editor.remove_index(
+                apps.get_model('recipes', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_storage'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:11
+
+from django.db import migrations, models
+
+from recipes.images import get_available_widths
+
+
+def record_image_widths(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    storage = Recipe._meta.get_field('image').storage
+    images = Recipe.objects.exclude(image='').values_list(
+        'image', flat=True).distinct()
+    for image in images:
+        widths = get_available_widths(storage, image)
+        if widths:
+            Recipe.objects.filter(image=image).update(image_widths=widths)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_widths',
+            field=models.JSONField(default=list, editable=False, verbose_name='Ширины миниатюр'),
+        ),
+        migrations.RunPython(record_image_widths, migrations.RunPython.noop),
+    ]
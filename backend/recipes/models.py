@@ -1,10 +1,14 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models import OuterRef, Prefetch, Subquery
 
 from users.models import User
 
 from .constants import (LENGTH, MIN_LENGTH, MIN_COOKING_TIME,
-                        MAX_COOKING_TIME, DEFAULT_AMOUNT)
+                        MAX_COOKING_TIME, DEFAULT_AMOUNT, SEARCH_CONFIG)
+from .storage import ContentAddressedStorage
 
 
 class Ingredient(models.Model):
@@ -40,6 +44,31 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch('ingredientsinrecipe_set',
+                     queryset=IngredientsInRecipe.objects.select_related(
+                         'ingredients')))
+
+    def latest_per_author(self, limit=None):
+        if limit is None:
+            return self
+        return self.filter(id__in=Subquery(self.model.objects.filter(
+            author=OuterRef('author')).values('id')[:limit]))
+
+    def update_search_vectors(self):
+        ingredient_names = IngredientsInRecipe.objects.filter(
+            recipe=OuterRef('pk')).order_by().values('recipe').annotate(
+                names=StringAgg('ingredients__name', ' ')).values('names')
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+            + SearchVector(Subquery(ingredient_names), weight='C',
+                           config=SEARCH_CONFIG)))
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                verbose_name='Автор рецепта')
@@ -48,7 +77,10 @@ class Recipe(models.Model):
                                          through='IngredientsInRecipe',
                                          verbose_name='Ингредиенты')
     image = models.ImageField(verbose_name='Картинка',
-                              upload_to='recipes/')
+                              upload_to='recipes/',
+                              storage=ContentAddressedStorage())
+    image_widths = models.JSONField(default=list, editable=False,
+                                    verbose_name='Ширины миниатюр')
     name = models.CharField(max_length=LENGTH,
                             verbose_name='Название')
     text = models.CharField(max_length=LENGTH, verbose_name='Описание')
@@ -60,10 +92,17 @@ class Recipe(models.Model):
                                        verbose_name='Время на рецепт')
 
     pub_date = models.DateTimeField(verbose_name='Дата', auto_now_add=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепты'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(fields=['pub_date', 'id'],
+                         name='recipe_pub_date_id_idx')
+        ]
 
     def __str__(self):
         return self.name
@@ -77,6 +116,10 @@ class FavoriteRecipe(models.Model):
 
     class Meta:
         verbose_name = 'Любимые рецепты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_favorite_user_recipe')
+        ]
 
     def __str__(self):
         return f'{self.user}, {self.recipe}'
@@ -92,6 +135,10 @@ class IngredientsInRecipe(models.Model):
 
     class Meta:
         verbose_name = 'Список ингредиентов для рецепта'
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'ingredients'],
+                                    name='unique_recipe_ingredient')
+        ]
 
     def __str__(self):
         return f'{self.recipe}, {self.ingredients}, {self.amount}'
@@ -105,6 +152,10 @@ class ListProducts(models.Model):
 
     class Meta:
         verbose_name = 'Список покупок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_cart_user_recipe')
+        ]
 
     def __str__(self):
         return f'{self.user}, {self.recipe}'
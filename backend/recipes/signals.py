@@ -0,0 +1,36 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import Signal, receiver
+
+from jobs.queue import enqueue, is_queued
+
+from .constants import THUMBNAIL_WIDTHS
+from .images import get_complete_widths, get_missing_variants
+from .models import Recipe
+
+image_variants_created = Signal()
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(instance, **kwargs):
+    image = instance.__dict__.get('image')
+    instance._saved_image = getattr(image, 'name', image)
+
+
+@receiver(post_save, sender=Recipe)
+def create_image_variants(instance, update_fields, **kwargs):
+    if not instance.image or update_fields == frozenset({'image_widths'}):
+        return
+    name = instance.image.name
+    changed = name != instance._saved_image
+    instance._saved_image = name
+    if not changed and (len(instance.image_widths) == len(THUMBNAIL_WIDTHS)
+                        or is_queued('image_variants', image=name)):
+        return
+    missing = get_missing_variants(instance.image.storage, name)
+    widths = get_complete_widths(missing)
+    if widths != instance.image_widths:
+        instance.image_widths = widths
+        instance.save(update_fields=['image_widths'])
+    if missing and not (changed and is_queued('image_variants',
+                                              image=name)):
+        enqueue('image_variants', image=name)
@@ -0,0 +1,21 @@
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_ADDRESSED_NAME = re.compile(r'[0-9a-f]{64}\.[a-z0-9]+')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def is_content_addressed(self, name):
+        return bool(CONTENT_ADDRESSED_NAME.fullmatch(os.path.basename(name)))
+
+    def get_available_name(self, name, max_length=None):
+        if self.is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if self.is_content_addressed(name) and self.exists(name):
+            return name
+        return super()._save(name, content)
@@ -0,0 +1,21 @@
+from django.core.management import call_command
+
+from jobs.queue import task
+
+from .images import generate_variants, get_available_widths
+from .models import Recipe
+from .signals import image_variants_created
+
+
+@task('image_variants')
+def create_image_variants(image):
+    storage = Recipe.image.field.storage
+    generate_variants(storage, image)
+    Recipe.objects.filter(image=image).update(
+        image_widths=get_available_widths(storage, image))
+    image_variants_created.send(sender=Recipe, image=image)
+
+
+@task('import_catalog')
+def import_catalog(path, model='ingredients'):
+    call_command('import_catalog', path, model=model)
@@ -0,0 +1,155 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from jobs.models import Job
+from users.models import Follow, User
+
+from .fake_data import FakeDataGenerator
+from .models import FavoriteRecipe, Ingredient, ListProducts, Recipe, Tag
+from .tasks import create_image_variants
+
+EXPLAIN_VENDORS = ('postgresql', 'sqlite')
+MEDIA_ROOT = tempfile.mkdtemp()
+SEED_OPTIONS = {'users': 6, 'recipes': 12, 'favorites': 20,
+                'shopping_carts': 10, 'follows': 8}
+
+
+@skipUnless(connection.vendor in EXPLAIN_VENDORS,
+            'Формат плана запроса зависит от СУБД')
+class QueryPlanTest(TestCase):
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assert_uses_index(self, queryset, index):
+        self.assertIn(index, queryset.explain())
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'SQLite называет индексы ограничений sqlite_autoindex_*')
+    def test_relation_lookups_use_unique_constraints(self):
+        for model, index in ((FavoriteRecipe, 'unique_favorite_user_recipe'),
+                             (ListProducts, 'unique_cart_user_recipe')):
+            with self.subTest(index=index):
+                self.assert_uses_index(
+                    model.objects.filter(user_id=1, recipe_id=1), index)
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'SQLite называет индексы ограничений sqlite_autoindex_*')
+    def test_user_filters_use_unique_constraints(self):
+        for lookup, index in (
+                ('favoriterecipe__user_id', 'unique_favorite_user_recipe'),
+                ('listproducts__user_id', 'unique_cart_user_recipe')):
+            with self.subTest(lookup=lookup):
+                self.assert_uses_index(
+                    Recipe.objects.filter(**{lookup: 1}), index)
+
+    def test_recipe_list_uses_pub_date_index(self):
+        self.assert_uses_index(
+            Recipe.objects.order_by('-pub_date', '-id')[:6],
+            'recipe_pub_date_id_idx')
+
+
+class ImportCatalogTest(TestCase):
+    def import_tags(self, content):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write(content)
+            file.flush()
+            output = StringIO()
+            call_command('import_catalog', file.name, model='tags',
+                         stdout=output)
+        return output.getvalue().strip()
+
+    def test_rows_colliding_on_other_unique_fields_are_skipped(self):
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+        Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+        for _ in range(2):
+            self.assertEqual(
+                self.import_tags('Завтрак,#000000,brk\n'
+                                 'Ужин,#49B64E,dinner\n'
+                                 'Обед,#E26C2D,lunch\n'),
+                'Теги: добавлено 0, обновлено 0, пропущено 3')
+        self.assertEqual(Tag.objects.count(), 2)
+        self.assertEqual(
+            self.import_tags('Ужин,#8775D2,dinner\n'
+                             'Обед,#000000,lunch\n'),
+            'Теги: добавлено 1, обновлено 1, пропущено 0')
+        self.assertEqual(Tag.objects.get(slug='lunch').color, '#000000')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SeedFakeDataTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(20))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self, **options):
+        call_command('seed_fake_data', stdout=StringIO(),
+                     **{**SEED_OPTIONS, **options})
+
+    def get_counts(self):
+        return [model.objects.count() for model in (
+            User, Recipe, FavoriteRecipe, ListProducts, Follow)]
+
+    def test_rerun_with_same_seed_adds_nothing(self):
+        self.seed()
+        counts = self.get_counts()
+        self.assertEqual(counts, [6, 12, 20, 10, 8])
+        self.seed()
+        self.assertEqual(self.get_counts(), counts)
+        self.seed(users=0)
+        self.assertEqual(self.get_counts(), counts)
+
+    def test_recipes_need_users(self):
+        self.seed(users=0, recipes=0)
+        self.assertEqual(self.get_counts(), [0, 0, 0, 0, 0])
+        with self.assertRaises(CommandError):
+            self.seed(users=0)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantJobTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        FakeDataGenerator().generate(users=1, recipes=1,
+                                     ingredients_per_recipe=0, favorites=0,
+                                     follows=0)
+
+    def test_saves_do_not_duplicate_variant_jobs(self):
+        for _ in range(3):
+            Recipe.objects.get().save()
+        jobs = Job.objects.filter(name='image_variants')
+        self.assertEqual(jobs.count(), 1)
+        jobs.update(status=Job.DONE)
+        create_image_variants(**jobs.get().payload)
+        recipe = Recipe.objects.get()
+        with mock.patch.object(recipe.image.storage, 'exists') as exists:
+            recipe.save()
+        exists.assert_not_called()
+        self.assertEqual(jobs.count(), 1)
+
+    def test_unchanged_image_is_requeued_after_one_check(self):
+        jobs = Job.objects.filter(name='image_variants')
+        jobs.delete()
+        recipe = Recipe.objects.get()
+        with mock.patch.object(recipe.image.storage, 'exists',
+                               return_value=False), \
+                CaptureQueriesContext(connection) as captured:
+            recipe.save()
+        self.assertEqual(len([query for query in captured
+                              if Job._meta.db_table in query['sql']]), 2)
+        self.assertEqual(jobs.count(), 1)
@@ -0,0 +1,9 @@
+from itertools import islice
+
+
+def get_batches(rows, size):
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
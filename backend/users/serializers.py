@@ -2,8 +2,10 @@ from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from api.relations import get_relations
+
 from .constants import LENGTH, EMAIL_LENGTH
-from .models import User, Follow
+from .models import User
 from .validators import validate_username
 
 
@@ -31,8 +33,5 @@ class CustomUserSerializer(UserSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, author):
-        request = self.context.get('request')
-        if request.user and request.user.is_authenticated:
-            return Follow.objects.filter(user=request.user,
-                                         author=author).exists()
-        return False
+        return author.id in get_relations(
+            self.context.get('request')).following
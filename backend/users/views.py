@@ -1,12 +1,16 @@
+from django.db.models import Count, Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from api import serializers
+from api.pagination import UserPagination
+from api.utils import create_unique, delete_existing
+from recipes.models import Recipe
 
 from .models import User, Follow
 from .serializers import CustomUserSerializer
@@ -15,7 +19,7 @@ from .serializers import CustomUserSerializer
 class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = UserPagination
 
     http_method_names = ['get', 'post', 'delete', 'patch']
 
@@ -30,23 +34,20 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def subscribe(self, request, **kwargs):
-        user = request.user
         author = get_object_or_404(User, id=kwargs.get('id'))
-        follow_instance = Follow(user=user, author=author)
-        serializer = serializers.FollowSerializer(instance=follow_instance,
-                                                  data=request.data,
+        if author == request.user:
+            raise ValidationError('Нельзя подписаться на самого себя!')
+        follow = create_unique(Follow, 'Уже есть такая подписка',
+                               user=request.user, author=author)
+        serializer = serializers.FollowSerializer(follow,
                                                   context={
                                                       "request": request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        Follow.objects.create(user=user, author=author)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, **kwargs):
-        author = get_object_or_404(User, id=kwargs.get('id'))
-        get_object_or_404(Follow.objects.filter(user=request.user,
-                                                author=author)).delete()
+        delete_existing(Follow.objects.filter(user=request.user,
+                                              author_id=kwargs.get('id')))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -54,7 +55,15 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def subscriptions(self, request):
-        subs = self.paginate_queryset(Follow.objects.filter(user=request.user))
+        subs = self.paginate_queryset(
+            Follow.objects.filter(user=request.user).select_related(
+                'author').annotate(
+                recipes_count=Count('author__recipe')).order_by('-id'))
+        prefetch_related_objects(subs, Prefetch(
+            'author__recipe_set',
+            queryset=Recipe.objects.latest_per_author(
+                serializers.get_recipes_limit(request)),
+            to_attr='limited_recipes'))
         serializer = serializers.FollowSerializer(subs, many=True,
                                                   context={'request': request})
         return self.get_paginated_response(serializer.data)